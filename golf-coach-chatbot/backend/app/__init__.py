@@ -0,0 +1,23 @@
+from flask import Flask
+
+
+def createApp() -> Flask:
+    """Build the Flask app.
+
+    Nothing here opens a Firestore client, builds a Gmail client or starts a thread;
+    those are created on first use in each worker process, so it is safe to call
+    this in a pre-forking server's master process (e.g. ``gunicorn --preload``).
+    """
+    from app.main import accountRoutes
+    from app.routes.chat_routes import chatRoutes
+    from app.routes.swing_routes import swingRoutes
+    from app.routes.upload_routes import uploadRoutes
+    from app.utils.request_metrics import instrumentApp
+
+    app = Flask(__name__)
+    instrumentApp(app)
+    app.register_blueprint(accountRoutes)
+    app.register_blueprint(chatRoutes)
+    app.register_blueprint(swingRoutes)
+    app.register_blueprint(uploadRoutes)
+    return app
@@ -0,0 +1,73 @@
+import os
+
+# Session token -> user document cache kept in front of the Firestore lookups.
+SESSION_CACHE_SIZE = int(os.environ.get('SESSION_CACHE_SIZE', 1024))
+SESSION_CACHE_TTL = float(os.environ.get('SESSION_CACHE_TTL', 300))
+
+# Account storage: 'firestore' for the live project, 'memory' for offline runs.
+STORAGE_BACKEND = os.environ.get('STORAGE_BACKEND', 'firestore')
+
+# Outgoing email: 'gmail' sends through the Gmail API, 'file' writes .eml files to
+# EMAIL_OUTBOX_DIR and 'smtp' relays through SMTP_HOST.
+EMAIL_TRANSPORT = os.environ.get('EMAIL_TRANSPORT', 'gmail')
+EMAIL_OUTBOX_DIR = os.environ.get('EMAIL_OUTBOX_DIR', 'outbox')
+EMAIL_WORKERS = int(os.environ.get('EMAIL_WORKERS', 2))
+EMAIL_MAX_ATTEMPTS = int(os.environ.get('EMAIL_MAX_ATTEMPTS', 5))
+EMAIL_RETRY_BACKOFF = float(os.environ.get('EMAIL_RETRY_BACKOFF', 1))
+SMTP_HOST = os.environ.get('SMTP_HOST', 'localhost')
+SMTP_PORT = int(os.environ.get('SMTP_PORT', 25))
+SMTP_USERNAME = os.environ.get('SMTP_USERNAME')
+SMTP_PASSWORD = os.environ.get('SMTP_PASSWORD')
+
+# Coach chat: 'fake' is a deterministic local model for offline runs and load tests,
+# 'openai' streams from an OpenAI-compatible chat completions API.
+CHAT_MODEL_BACKEND = os.environ.get('CHAT_MODEL_BACKEND', 'openai')
+CHAT_MODEL = os.environ.get('CHAT_MODEL', 'gpt-4o-mini')
+OPENAI_API_KEY = os.environ.get('OPENAI_API_KEY', '')
+OPENAI_BASE_URL = os.environ.get('OPENAI_BASE_URL', 'https://api.openai.com/v1')
+# Each open chat stream holds a server thread for the whole reply. SERVER_THREADS is the
+# thread pool of one worker process (gunicorn --threads); streams default to half of it
+# and are always left at least one thread short of it, so account routes stay served.
+SERVER_THREADS = int(os.environ.get('SERVER_THREADS', 8))
+CHAT_MAX_STREAMS = max(1, min(int(os.environ.get('CHAT_MAX_STREAMS') or SERVER_THREADS // 2), SERVER_THREADS - 1))
+FAKE_MODEL_FIRST_TOKEN_DELAY = float(os.environ.get('FAKE_MODEL_FIRST_TOKEN_DELAY', 0))
+FAKE_MODEL_TOKEN_DELAY = float(os.environ.get('FAKE_MODEL_TOKEN_DELAY', 0))
+
+# Conversation history. Token counts are estimated at roughly four characters per token.
+CONVERSATION_PAGE_SIZE = int(os.environ.get('CONVERSATION_PAGE_SIZE', 20))
+CONVERSATION_MAX_PAGE_SIZE = int(os.environ.get('CONVERSATION_MAX_PAGE_SIZE', 50))
+CONTEXT_MAX_MESSAGES = int(os.environ.get('CONTEXT_MAX_MESSAGES', 20))
+CONTEXT_TOKEN_BUDGET = int(os.environ.get('CONTEXT_TOKEN_BUDGET', 1500))
+SUMMARY_TOKEN_BUDGET = int(os.environ.get('SUMMARY_TOKEN_BUDGET', 300))
+
+# Cache of coach answers to standalone questions, keyed by normalized question and
+# golfer profile. ANSWER_CACHE_PATH enables the SQLite tier that survives restarts;
+# ANSWER_CACHE_SIMILARITY > 0 also serves near-duplicate questions.
+ANSWER_CACHE_ENABLED = os.environ.get('ANSWER_CACHE_ENABLED', '1') == '1'
+ANSWER_CACHE_SIZE = int(os.environ.get('ANSWER_CACHE_SIZE', 2048))
+ANSWER_CACHE_TTL = float(os.environ.get('ANSWER_CACHE_TTL', 7 * 24 * 3600))
+ANSWER_CACHE_PATH = os.environ.get('ANSWER_CACHE_PATH', '')
+ANSWER_CACHE_PERSISTENT_SIZE = int(os.environ.get('ANSWER_CACHE_PERSISTENT_SIZE', 10000))
+ANSWER_CACHE_SIMILARITY = float(os.environ.get('ANSWER_CACHE_SIMILARITY', 0))
+
+# Limits on one keypoint upload to the swing metrics endpoint.
+SWING_MAX_SWINGS = int(os.environ.get('SWING_MAX_SWINGS', 32))
+SWING_MAX_FRAMES = int(os.environ.get('SWING_MAX_FRAMES', 1200))
+SWING_MAX_BODY_BYTES = int(os.environ.get('SWING_MAX_BODY_BYTES', 64 * 1024 * 1024))
+
+# Chunked swing video uploads. UPLOAD_STORAGE is 'local' (files under UPLOAD_DIR) or
+# 'gcs' (UPLOAD_BUCKET). Finished uploads are processed by UPLOAD_WORKERS threads per
+# process; videos are sampled at UPLOAD_FRAME_RATE frames per second with FFMPEG_PATH.
+UPLOAD_STORAGE = os.environ.get('UPLOAD_STORAGE', 'local')
+UPLOAD_DIR = os.environ.get('UPLOAD_DIR', 'uploads')
+UPLOAD_BUCKET = os.environ.get('UPLOAD_BUCKET', '')
+UPLOAD_MAX_BYTES = int(os.environ.get('UPLOAD_MAX_BYTES', 512 * 1024 * 1024))
+UPLOAD_CHUNK_SIZE = int(os.environ.get('UPLOAD_CHUNK_SIZE', 8 * 1024 * 1024))
+UPLOAD_WORKERS = int(os.environ.get('UPLOAD_WORKERS', 2))
+UPLOAD_FRAME_RATE = float(os.environ.get('UPLOAD_FRAME_RATE', 30))
+# Uploads queued or processing for this long belong to a worker that has gone away.
+UPLOAD_STALE_SECONDS = float(os.environ.get('UPLOAD_STALE_SECONDS', 1800))
+FFMPEG_PATH = os.environ.get('FFMPEG_PATH', 'ffmpeg')
+
+# Requests slower than this are logged with their storage breakdown; 0 disables the log.
+SLOW_REQUEST_MS = float(os.environ.get('SLOW_REQUEST_MS', 500))
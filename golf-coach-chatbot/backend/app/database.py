@@ -0,0 +1,663 @@
+import bisect
+import threading
+import time
+import uuid
+
+from app.utils import metrics
+
+USER_COLLECTION = 'user-info'
+RESET_COLLECTION = 'reset-password'
+CONVERSATION_COLLECTION = 'conversations'
+MESSAGE_COLLECTION = 'messages'
+UPLOAD_COLLECTION = 'swing-uploads'
+
+# Backend round trips and storage operations issued by the current request, and
+# running round-trip totals per endpoint.
+_rpcState = threading.local()
+_endpointRpcs = {}
+_endpointRpcsLock = threading.Lock()
+
+def beginRpcCount():
+    _rpcState.count = 0
+    _rpcState.operations = []
+
+def countRpc(count: int = 1):
+    _rpcState.count = getattr(_rpcState, 'count', 0) + count
+
+def getRpcCount() -> int:
+    return getattr(_rpcState, 'count', 0)
+
+def recordOperation(operation: str, kind: str, seconds: float):
+    metrics.backendOperationDuration.observe((operation, kind), seconds)
+    if not hasattr(_rpcState, 'operations'):
+        _rpcState.operations = []
+    _rpcState.operations.append((operation, kind, seconds))
+
+def getOperations() -> list:
+    """Return the ``(operation, kind, seconds)`` storage calls made by the current request."""
+    return list(getattr(_rpcState, 'operations', []))
+
+def recordEndpointRpcs(endpoint: str, count: int):
+    with _endpointRpcsLock:
+        totals = _endpointRpcs.setdefault(endpoint, {'requests': 0, 'rpcs': 0, 'max-rpcs': 0})
+        totals['requests'] += 1
+        totals['rpcs'] += count
+        totals['max-rpcs'] = max(totals['max-rpcs'], count)
+
+def getEndpointRpcStats() -> dict:
+    with _endpointRpcsLock:
+        return {
+            endpoint: dict(totals, **{'rpcs-per-request': totals['rpcs'] / totals['requests']})
+            for endpoint, totals in _endpointRpcs.items()
+        }
+
+
+class WriteBatch:
+    """Collects the mutations made while handling a request so they can be committed together.
+
+    Use as a context manager; the batch is committed when the block exits without an error.
+    Repeated updates to the same user are merged into a single write.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self.userCreates = {}
+        self.userUpdates = {}
+        self.resetUpserts = {}
+
+    def createUser(self, userData: dict) -> str:
+        userId = self.store.newUserId()
+        self.userCreates[userId] = dict(userData)
+        return userId
+
+    def updateUser(self, userId: str, fields: dict):
+        if userId in self.userCreates:
+            self.userCreates[userId].update(fields)
+        else:
+            self.userUpdates.setdefault(userId, {}).update(fields)
+
+    def upsertResetCode(self, email: str, resetNumber: str, timeRequested):
+        self.resetUpserts[email] = (resetNumber, timeRequested)
+
+    def isEmpty(self) -> bool:
+        return not (self.userCreates or self.userUpdates or self.resetUpserts)
+
+    def commit(self):
+        if not self.isEmpty():
+            self.store.commitBatch(self)
+        self.userCreates, self.userUpdates, self.resetUpserts = {}, {}, {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, excType, exc, traceback):
+        if excType is None:
+            self.commit()
+        return False
+
+
+class UserStore:
+    """Storage operations used by the account service.
+
+    Lookups return ``(documentId, data)`` tuples, or ``None`` when nothing matches.
+    Writes go through ``batch()``; the single-write helpers each commit a batch of one.
+    """
+
+    def findUserByEmail(self, email: str):
+        raise NotImplementedError
+
+    def findUserBySessionToken(self, sessionToken: str):
+        raise NotImplementedError
+
+    def findResetCode(self, resetNumber: str):
+        raise NotImplementedError
+
+    def newUserId(self) -> str:
+        raise NotImplementedError
+
+    def commitBatch(self, batch: WriteBatch):
+        raise NotImplementedError
+
+    def batch(self) -> WriteBatch:
+        return WriteBatch(self)
+
+    def createUser(self, userData: dict) -> str:
+        with self.batch() as batch:
+            return batch.createUser(userData)
+
+    def updateUser(self, userId: str, fields: dict):
+        with self.batch() as batch:
+            batch.updateUser(userId, fields)
+
+    def upsertResetCode(self, email: str, resetNumber: str, timeRequested):
+        with self.batch() as batch:
+            batch.upsertResetCode(email, resetNumber, timeRequested)
+
+
+class FirestoreStore(UserStore):
+    def __init__(self, db):
+        self.db = db
+
+    def _first(self, collection: str, field: str, value):
+        countRpc()
+        matching = self.db.collection(collection).where(field, '==', value).limit(1).get()
+        if len(matching) == 0:
+            return None
+        return matching[0].id, matching[0].to_dict()
+
+    def findUserByEmail(self, email: str):
+        return self._first(USER_COLLECTION, 'email', email)
+
+    def findUserBySessionToken(self, sessionToken: str):
+        return self._first(USER_COLLECTION, 'session_token', sessionToken)
+
+    def findResetCode(self, resetNumber: str):
+        return self._first(RESET_COLLECTION, 'reset_number', resetNumber)
+
+    def newUserId(self) -> str:
+        # Document ids are generated client side, so this does not cost a round trip.
+        return self.db.collection(USER_COLLECTION).document().id
+
+    def _applyUserWrites(self, writer, batch: WriteBatch):
+        users = self.db.collection(USER_COLLECTION)
+        for userId, userData in batch.userCreates.items():
+            writer.set(users.document(userId), userData)
+        for userId, fields in batch.userUpdates.items():
+            writer.update(users.document(userId), fields)
+
+    def _commitInTransaction(self, transaction, batch: WriteBatch):
+        resets = self.db.collection(RESET_COLLECTION)
+        existingResets = {}
+        for email in batch.resetUpserts:
+            countRpc()
+            matching = list(transaction.get(resets.where('email', '==', email).limit(1)))
+            existingResets[email] = matching[0].reference if matching else None
+
+        self._applyUserWrites(transaction, batch)
+        for email, (resetNumber, timeRequested) in batch.resetUpserts.items():
+            if existingResets[email] is None:
+                transaction.set(resets.document(), {
+                    'email': email,
+                    'reset_number': resetNumber,
+                    'time_requested': timeRequested
+                })
+            else:
+                transaction.update(existingResets[email], {'reset_number': resetNumber})
+
+    def commitBatch(self, batch: WriteBatch):
+        if batch.resetUpserts:
+            # Reset-code upserts read before they write, so they need a transaction
+            # rather than a blind write batch. Begin and commit are one RPC each.
+            from google.cloud import firestore
+
+            countRpc(2)
+            firestore.transactional(self._commitInTransaction)(self.db.transaction(), batch)
+        else:
+            countRpc()
+            writeBatch = self.db.batch()
+            self._applyUserWrites(writeBatch, batch)
+            writeBatch.commit()
+
+
+class MemoryStore(UserStore):
+    """In-process store with hash indexes on email, session_token and reset_number.
+
+    Used for offline runs, tests and benchmarks; nothing is persisted. Every lookup
+    and batch commit counts as one round trip so numbers are comparable with Firestore.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._users = {}
+        self._resets = {}
+        self._usersByEmail = {}
+        self._usersBySessionToken = {}
+        self._resetsByEmail = {}
+        self._resetsByNumber = {}
+
+    def _reindex(self, index: dict, oldValue, newValue, documentId: str):
+        if oldValue is not None and index.get(oldValue) == documentId:
+            del index[oldValue]
+        if newValue is not None:
+            index[newValue] = documentId
+
+    def _lookup(self, documents: dict, index: dict, value):
+        countRpc()
+        with self._lock:
+            documentId = index.get(value)
+            if documentId is None:
+                return None
+            return documentId, dict(documents[documentId])
+
+    def findUserByEmail(self, email: str):
+        return self._lookup(self._users, self._usersByEmail, email)
+
+    def findUserBySessionToken(self, sessionToken: str):
+        return self._lookup(self._users, self._usersBySessionToken, sessionToken)
+
+    def findResetCode(self, resetNumber: str):
+        return self._lookup(self._resets, self._resetsByNumber, resetNumber)
+
+    def newUserId(self) -> str:
+        return uuid.uuid4().hex
+
+    def _updateUser(self, userId: str, fields: dict):
+        userData = self._users.setdefault(userId, {})
+        self._reindex(self._usersByEmail, userData.get('email'), fields.get('email', userData.get('email')), userId)
+        self._reindex(self._usersBySessionToken, userData.get('session_token'),
+                      fields.get('session_token', userData.get('session_token')), userId)
+        userData.update(fields)
+
+    def _upsertResetCode(self, email: str, resetNumber: str, timeRequested):
+        resetId = self._resetsByEmail.get(email)
+        if resetId is None:
+            resetId = uuid.uuid4().hex
+            self._resets[resetId] = {'email': email, 'reset_number': None, 'time_requested': timeRequested}
+            self._resetsByEmail[email] = resetId
+        resetData = self._resets[resetId]
+        self._reindex(self._resetsByNumber, resetData['reset_number'], resetNumber, resetId)
+        resetData['reset_number'] = resetNumber
+
+    def commitBatch(self, batch: WriteBatch):
+        countRpc()
+        with self._lock:
+            # Like a Firestore batch, nothing is written if any update targets a missing user.
+            for userId in batch.userUpdates:
+                if userId not in self._users:
+                    raise KeyError(f'No user with id {userId}')
+            for userId, userData in batch.userCreates.items():
+                self._updateUser(userId, userData)
+            for userId, fields in batch.userUpdates.items():
+                self._updateUser(userId, fields)
+            for email, (resetNumber, timeRequested) in batch.resetUpserts.items():
+                self._upsertResetCode(email, resetNumber, timeRequested)
+
+
+class ConversationStore:
+    """Conversations and their messages, keyed by user.
+
+    Conversations are listed newest first and paged with an opaque ``(updated-at, id)``
+    cursor rather than an offset. Messages carry a per-conversation ``index`` and are
+    paged backwards from ``beforeIndex``, returned oldest first.
+    """
+
+    def createConversation(self, userId: str, title: str, now) -> str:
+        raise NotImplementedError
+
+    def getConversation(self, conversationId: str):
+        raise NotImplementedError
+
+    def listConversations(self, userId: str, limit: int, cursor: tuple = None) -> tuple:
+        """Return ``(conversations, nextCursor)``; ``nextCursor`` is None on the last page."""
+        raise NotImplementedError
+
+    def appendMessages(self, conversationId: str, messages: list, now):
+        raise NotImplementedError
+
+    def listMessages(self, conversationId: str, limit: int, beforeIndex: int = None, afterIndex: int = -1) -> list:
+        raise NotImplementedError
+
+    def updateSummary(self, conversationId: str, summary: str, summaryThrough: int):
+        raise NotImplementedError
+
+
+def newConversation(userId: str, title: str, now) -> dict:
+    return {
+        'user-id': userId,
+        'title': title,
+        'created-at': now,
+        'updated-at': now,
+        'message-count': 0,
+        'summary': '',
+        'summary-through': 0
+    }
+
+
+def quoteField(name: str) -> str:
+    # Query field paths are parsed, and a bare name may only hold letters, digits and
+    # underscores; backticks let it contain the hyphens these documents use.
+    return f'`{name}`'
+
+
+class FirestoreConversationStore(ConversationStore):
+    """Stores conversations in ``conversations`` with a ``messages`` subcollection.
+
+    Listing needs a composite index on (user-id ASC, updated-at DESC, __name__ DESC).
+    """
+
+    def __init__(self, db):
+        self.db = db
+
+    def _messages(self, conversationId: str):
+        return self.db.collection(CONVERSATION_COLLECTION).document(conversationId).collection(MESSAGE_COLLECTION)
+
+    def createConversation(self, userId: str, title: str, now) -> str:
+        countRpc()
+        newDoc = self.db.collection(CONVERSATION_COLLECTION).document()
+        newDoc.set(newConversation(userId, title, now))
+        return newDoc.id
+
+    def getConversation(self, conversationId: str):
+        countRpc()
+        snapshot = self.db.collection(CONVERSATION_COLLECTION).document(conversationId).get()
+        if not snapshot.exists:
+            return None
+        return snapshot.id, snapshot.to_dict()
+
+    def listConversations(self, userId: str, limit: int, cursor: tuple = None) -> tuple:
+        from google.cloud import firestore
+
+        conversations = self.db.collection(CONVERSATION_COLLECTION)
+        query = (conversations.where(quoteField('user-id'), '==', userId)
+                 .order_by(quoteField('updated-at'), direction=firestore.Query.DESCENDING)
+                 .order_by('__name__', direction=firestore.Query.DESCENDING))
+        if cursor is not None:
+            # Cursor values are matched to the order_by fields by position.
+            query = query.start_after(list(cursor))
+
+        countRpc()
+        page = [(snapshot.id, snapshot.to_dict()) for snapshot in query.limit(limit + 1).get()]
+        if len(page) <= limit:
+            return page, None
+        page = page[:limit]
+        return page, (page[-1][1]['updated-at'], page[-1][0])
+
+    def _appendInTransaction(self, transaction, conversationId: str, messages: list, now):
+        conversationRef = self.db.collection(CONVERSATION_COLLECTION).document(conversationId)
+        countRpc()
+        messageCount = conversationRef.get(transaction=transaction).to_dict()['message-count']
+        for offset, message in enumerate(messages):
+            index = messageCount + offset
+            transaction.set(self._messages(conversationId).document(f'{index:08d}'),
+                            dict(message, index=index, **{'created-at': now}))
+        transaction.update(conversationRef, {'message-count': messageCount + len(messages), 'updated-at': now})
+
+    def appendMessages(self, conversationId: str, messages: list, now):
+        # Message indexes come from the conversation's count, so read and write together.
+        from google.cloud import firestore
+
+        countRpc(2)
+        firestore.transactional(self._appendInTransaction)(self.db.transaction(), conversationId, messages, now)
+
+    def listMessages(self, conversationId: str, limit: int, beforeIndex: int = None, afterIndex: int = -1) -> list:
+        from google.cloud import firestore
+
+        query = self._messages(conversationId).where('index', '>', afterIndex)
+        if beforeIndex is not None:
+            query = query.where('index', '<', beforeIndex)
+        countRpc()
+        snapshots = query.order_by('index', direction=firestore.Query.DESCENDING).limit(limit).get()
+        return [snapshot.to_dict() for snapshot in reversed(snapshots)]
+
+    def updateSummary(self, conversationId: str, summary: str, summaryThrough: int):
+        countRpc()
+        self.db.collection(CONVERSATION_COLLECTION).document(conversationId).update({
+            'summary': summary,
+            'summary-through': summaryThrough
+        })
+
+
+class MemoryConversationStore(ConversationStore):
+    """In-process conversation store.
+
+    Each user's conversations are kept in a list sorted by ``(updated-at, id)``, so a page
+    is a binary search to the cursor followed by a slice.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._conversations = {}
+        self._messages = {}
+        self._conversationsByUser = {}
+
+    def createConversation(self, userId: str, title: str, now) -> str:
+        countRpc()
+        conversationId = uuid.uuid4().hex
+        with self._lock:
+            self._conversations[conversationId] = newConversation(userId, title, now)
+            self._messages[conversationId] = []
+            bisect.insort(self._conversationsByUser.setdefault(userId, []), (now, conversationId))
+        return conversationId
+
+    def getConversation(self, conversationId: str):
+        countRpc()
+        with self._lock:
+            conversation = self._conversations.get(conversationId)
+            return None if conversation is None else (conversationId, dict(conversation))
+
+    def listConversations(self, userId: str, limit: int, cursor: tuple = None) -> tuple:
+        countRpc()
+        with self._lock:
+            keys = self._conversationsByUser.get(userId, [])
+            end = len(keys) if cursor is None else bisect.bisect_left(keys, tuple(cursor))
+            start = max(0, end - limit)
+            page = [(conversationId, dict(self._conversations[conversationId]))
+                    for updatedAt, conversationId in reversed(keys[start:end])]
+        return page, (keys[start] if start > 0 else None)
+
+    def appendMessages(self, conversationId: str, messages: list, now):
+        countRpc()
+        with self._lock:
+            conversation = self._conversations[conversationId]
+            storedMessages = self._messages[conversationId]
+            for message in messages:
+                storedMessages.append(dict(message, index=len(storedMessages), **{'created-at': now}))
+
+            userKeys = self._conversationsByUser[conversation['user-id']]
+            userKeys.remove((conversation['updated-at'], conversationId))
+            bisect.insort(userKeys, (now, conversationId))
+            conversation['updated-at'] = now
+            conversation['message-count'] = len(storedMessages)
+
+    def listMessages(self, conversationId: str, limit: int, beforeIndex: int = None, afterIndex: int = -1) -> list:
+        countRpc()
+        with self._lock:
+            storedMessages = self._messages.get(conversationId, [])
+            end = len(storedMessages) if beforeIndex is None else max(0, min(beforeIndex, len(storedMessages)))
+            start = max(afterIndex + 1, end - limit, 0)
+            return [dict(message) for message in storedMessages[start:end]]
+
+    def updateSummary(self, conversationId: str, summary: str, summaryThrough: int):
+        countRpc()
+        with self._lock:
+            self._conversations[conversationId].update({'summary': summary, 'summary-through': summaryThrough})
+
+
+class UploadStore:
+    """Swing video uploads and the state of the job that processes each one.
+
+    The bytes themselves live in upload storage; this keeps only the record that the
+    status endpoint reads, so every worker process sees the same state.
+    """
+
+    def createUpload(self, upload: dict) -> str:
+        raise NotImplementedError
+
+    def getUpload(self, uploadId: str):
+        raise NotImplementedError
+
+    def updateUpload(self, uploadId: str, fields: dict):
+        raise NotImplementedError
+
+    def transitionUpload(self, uploadId: str, fromState: str, fields: dict) -> bool:
+        """Apply ``fields`` only if the upload is still in ``fromState``; return whether it was.
+
+        Requests racing to move an upload on, possibly in different worker processes,
+        use this so exactly one of them wins.
+        """
+        raise NotImplementedError
+
+    def findStaleUploads(self, states: tuple, updatedBefore) -> list:
+        """``(uploadId, upload)`` for uploads in one of ``states`` not updated since ``updatedBefore``."""
+        raise NotImplementedError
+
+
+def newUpload(userId: str, fileName: str, size: int, contentType: str, options: dict, now) -> dict:
+    return {
+        'user-id': userId,
+        'file-name': fileName,
+        'content-type': contentType,
+        'size': size,
+        'options': options,
+        'state': 'uploading',
+        'object': None,
+        'result': None,
+        'error': None,
+        'created-at': now,
+        'updated-at': now
+    }
+
+
+class FirestoreUploadStore(UploadStore):
+    def __init__(self, db):
+        self.db = db
+
+    def createUpload(self, upload: dict) -> str:
+        countRpc()
+        newDoc = self.db.collection(UPLOAD_COLLECTION).document()
+        newDoc.set(upload)
+        return newDoc.id
+
+    def getUpload(self, uploadId: str):
+        countRpc()
+        snapshot = self.db.collection(UPLOAD_COLLECTION).document(uploadId).get()
+        if not snapshot.exists:
+            return None
+        return snapshot.id, snapshot.to_dict()
+
+    def updateUpload(self, uploadId: str, fields: dict):
+        countRpc()
+        self.db.collection(UPLOAD_COLLECTION).document(uploadId).update(fields)
+
+    def _transitionInTransaction(self, transaction, uploadId: str, fromState: str, fields: dict) -> bool:
+        uploadRef = self.db.collection(UPLOAD_COLLECTION).document(uploadId)
+        countRpc()
+        if uploadRef.get(transaction=transaction).to_dict()['state'] != fromState:
+            return False
+        transaction.update(uploadRef, fields)
+        return True
+
+    def transitionUpload(self, uploadId: str, fromState: str, fields: dict) -> bool:
+        # The state is read and written in one transaction; begin and commit are one RPC each.
+        from google.cloud import firestore
+
+        countRpc(2)
+        return firestore.transactional(self._transitionInTransaction)(self.db.transaction(), uploadId, fromState, fields)
+
+    def findStaleUploads(self, states: tuple, updatedBefore) -> list:
+        # Few uploads are in flight at once, so the age is filtered here rather than
+        # needing a composite index on state and updated-at.
+        countRpc()
+        snapshots = self.db.collection(UPLOAD_COLLECTION).where('state', 'in', list(states)).get()
+        uploads = [(snapshot.id, snapshot.to_dict()) for snapshot in snapshots]
+        return [(uploadId, upload) for uploadId, upload in uploads if upload['updated-at'] < updatedBefore]
+
+
+class MemoryUploadStore(UploadStore):
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._uploads = {}
+
+    def createUpload(self, upload: dict) -> str:
+        countRpc()
+        uploadId = uuid.uuid4().hex
+        with self._lock:
+            self._uploads[uploadId] = dict(upload)
+        return uploadId
+
+    def getUpload(self, uploadId: str):
+        countRpc()
+        with self._lock:
+            upload = self._uploads.get(uploadId)
+            return None if upload is None else (uploadId, dict(upload))
+
+    def updateUpload(self, uploadId: str, fields: dict):
+        countRpc()
+        with self._lock:
+            self._uploads[uploadId].update(fields)
+
+    def transitionUpload(self, uploadId: str, fromState: str, fields: dict) -> bool:
+        countRpc()
+        with self._lock:
+            upload = self._uploads[uploadId]
+            if upload['state'] != fromState:
+                return False
+            upload.update(fields)
+            return True
+
+    def findStaleUploads(self, states: tuple, updatedBefore) -> list:
+        countRpc()
+        with self._lock:
+            return [(uploadId, dict(upload)) for uploadId, upload in self._uploads.items()
+                    if upload['state'] in states and upload['updated-at'] < updatedBefore]
+
+
+# How each store method touches the backend, for the per-request breakdown.
+OPERATION_KINDS = {
+    'findUserByEmail': 'query',
+    'findUserBySessionToken': 'query',
+    'findResetCode': 'query',
+    'commitBatch': 'write',
+    'createConversation': 'write',
+    'getConversation': 'read',
+    'listConversations': 'query',
+    'appendMessages': 'write',
+    'listMessages': 'query',
+    'updateSummary': 'write',
+    'createUpload': 'write',
+    'getUpload': 'read',
+    'updateUpload': 'write',
+    'transitionUpload': 'write',
+    'findStaleUploads': 'query'
+}
+
+
+class InstrumentedStore:
+    """Wraps a store and records the duration and kind of every call in ``OPERATION_KINDS``."""
+
+    def __init__(self, store):
+        self.store = store
+
+    def __getattr__(self, name):
+        attribute = getattr(self.store, name)
+        kind = OPERATION_KINDS.get(name)
+        if kind is None:
+            return attribute
+
+        def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return attribute(*args, **kwargs)
+            finally:
+                recordOperation(name, kind, time.perf_counter() - started)
+        return timed
+
+    # Batches must commit back through this wrapper so the commit is timed too.
+    batch = UserStore.batch
+    createUser = UserStore.createUser
+    updateUser = UserStore.updateUser
+    upsertResetCode = UserStore.upsertResetCode
+
+
+def createStore(backend: str, db=None) -> UserStore:
+    if backend == 'memory':
+        return MemoryStore()
+    if backend == 'firestore':
+        return FirestoreStore(db)
+    raise ValueError(f'Unknown storage backend: {backend}')
+
+
+def createConversationStore(backend: str, db=None) -> ConversationStore:
+    if backend == 'memory':
+        return MemoryConversationStore()
+    if backend == 'firestore':
+        return FirestoreConversationStore(db)
+    raise ValueError(f'Unknown storage backend: {backend}')
+
+
+def createUploadStore(backend: str, db=None) -> UploadStore:
+    if backend == 'memory':
+        return MemoryUploadStore()
+    if backend == 'firestore':
+        return FirestoreUploadStore(db)
+    raise ValueError(f'Unknown storage backend: {backend}')
@@ -1,20 +1,34 @@
 #https://blog.logrocket.com/integrating-flask-flutter-apps/
-from flask import Flask, request, jsonify
-from services import firebase_service
+from flask import Blueprint, request, jsonify
+from app.services import firebase_service
+from app.services import email_services
+from app.services import chatbot_services
+from app.services import upload_service
+from app import database
 import os
 
 
-app = Flask(__name__)
+accountRoutes = Blueprint('account', __name__)
 basedir = os.path.abspath(os.path.dirname(__file__))
 
-@app.route('/account/part1', methods=['POST'])
+@accountRoutes.route('/stats', methods=['GET'])
+def getStats():
+    return jsonify({
+        'session-cache': firebase_service.getSessionCacheStats(),
+        'backend-rpcs': database.getEndpointRpcStats(),
+        'email-outbox': email_services.getOutboxStats(),
+        'answer-cache': chatbot_services.getAnswerCacheStats(),
+        'upload-jobs': upload_service.getJobQueueStats()
+    })
+
+@accountRoutes.route('/account/part1', methods=['POST'])
 def createAccountBasics():
     response = firebase_service.createAccountBasics(request.json)
 
     return jsonify(response)
 
 
-@app.route('/account', methods=['GET'])
+@accountRoutes.route('/account', methods=['GET'])
 def getAccount():
     email = request.args.get('email')
     password = request.args.get('password')
@@ -23,7 +37,7 @@ def getAccount():
 
     return jsonify(result)
 
-@app.route('/account/info', methods=['GET'])
+@accountRoutes.route('/account/info', methods=['GET'])
 def getAccountInfo():
     session_token = request.args.get('session_token')
 
@@ -31,29 +45,26 @@ def getAccountInfo():
 
     return jsonify(result)
 
-@app.route('/account/update', methods=['POST'])
+@accountRoutes.route('/account/update', methods=['POST'])
 def updateAccountInfo():
     response = firebase_service.updateAccountInfo(request.json)
     return jsonify(response)
 
-@app.route('/account/reset', methods=['POST'])
+@accountRoutes.route('/account/reset', methods=['POST'])
 def sendResetPasswordEmail():
     email = request.json["email"]
     response = firebase_service.sendResetPasswordEmail(email)
     return jsonify(response)
 
-@app.route('/account/resetCode', methods=['POST'])
+@accountRoutes.route('/account/resetCode', methods=['POST'])
 def resetPasswordCode():
     code = request.json["code"]
     response = firebase_service.resetPasswordCode(code)
     return jsonify(response)
 
-@app.route('/account/resetPassword', methods=['POST'])
+@accountRoutes.route('/account/resetPassword', methods=['POST'])
 def resetPassword():
     password = request.json["password"]
     sessionToken = request.json["session_token"]
     response = firebase_service.resetPassword(password, sessionToken)
     return jsonify(response)
-
-if __name__ == '__main__':
-    app.run(debug=True)
\ No newline at end of file
@@ -0,0 +1,121 @@
+import json
+import logging
+import time
+
+from flask import Blueprint, Response, request, jsonify, stream_with_context
+from app import config
+from app.services import chatbot_services
+from app.services import conversation_service
+from app.services import firebase_service
+
+chatRoutes = Blueprint('chat', __name__)
+logger = logging.getLogger(__name__)
+
+def formatEvent(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@chatRoutes.route('/chat/stream', methods=['POST'])
+def streamChat():
+    data = request.json or {}
+    message = (data.get('message') or '').strip()
+    if len(message) < 1:
+        return jsonify({'status': 'error', 'message': 'Message is empty'}), 400
+
+    matchingUser = firebase_service.findUserBySessionToken(data.get('session_token'))
+    if matchingUser is None:
+        return jsonify({'status': 'error', 'message': 'Invalid session token'}), 401
+    userId, userData = matchingUser
+
+    conversationId = data.get('conversation_id') or None
+    matchingConversation = None
+    if conversationId:
+        matchingConversation = conversation_service.getUserConversation(userId, conversationId)
+        if matchingConversation is None:
+            return jsonify({'status': 'error', 'message': 'Conversation not found'}), 404
+
+    # Take the slot first: building the context can write the conversation's summary,
+    # which a request turned away as busy must not do.
+    if not chatbot_services.acquireStreamSlot():
+        return jsonify({'status': 'error', 'message': 'Coach is busy, try again shortly'}), 503
+    try:
+        history = conversation_service.buildContext(*matchingConversation) if matchingConversation else []
+    except Exception:
+        chatbot_services.releaseStreamSlot()
+        raise
+
+    def generate():
+        started = time.perf_counter()
+        firstTokenMs = None
+        nonlocal conversationId
+        tokens = []
+        try:
+            if conversationId is None:
+                conversationId, _ = conversation_service.startConversation(userId, message)
+            yield formatEvent('conversation', {'conversation_id': conversationId})
+
+            # A question with no earlier turns depends only on its text and the profile,
+            # so it can be answered from the cache without calling the model.
+            cachedAnswer = None if history else chatbot_services.getCachedAnswer(userData, message)
+            if cachedAnswer is not None:
+                reply = chatbot_services.splitTokens(cachedAnswer)
+            else:
+                reply = chatbot_services.streamCoachReply(userData, message, history)
+
+            for token in reply:
+                if firstTokenMs is None:
+                    firstTokenMs = (time.perf_counter() - started) * 1000
+                tokens.append(token)
+                yield formatEvent('token', {'token': token})
+            conversation_service.recordTurn(conversationId, message, ''.join(tokens))
+            if cachedAnswer is None and not history:
+                chatbot_services.cacheAnswer(userData, message, ''.join(tokens))
+            yield formatEvent('done', {
+                'status': 'success',
+                'conversation_id': conversationId,
+                'cached': cachedAnswer is not None,
+                'tokens': len(tokens),
+                'first-token-ms': firstTokenMs,
+                'total-ms': (time.perf_counter() - started) * 1000
+            })
+        except Exception:
+            logger.exception("Chat stream failed")
+            yield formatEvent('error', {'status': 'error', 'message': 'The coach could not finish this reply'})
+
+    response = Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+    # The server closes the response when the stream ends or the client goes away,
+    # even if the generator never started, so release the slot there.
+    response.call_on_close(chatbot_services.releaseStreamSlot)
+    return response
+
+
+def findRequestUser():
+    return firebase_service.findUserBySessionToken(request.args.get('session_token'))
+
+@chatRoutes.route('/chat/conversations', methods=['GET'])
+def listConversations():
+    matchingUser = findRequestUser()
+    if matchingUser is None:
+        return jsonify({'status': 'error', 'message': 'Invalid session token'}), 401
+
+    limit = request.args.get('limit', config.CONVERSATION_PAGE_SIZE, type=int)
+    try:
+        response = conversation_service.listConversations(matchingUser[0], limit, request.args.get('cursor'))
+    except ValueError:
+        return jsonify({'status': 'error', 'message': 'Invalid cursor'}), 400
+    return jsonify(response)
+
+@chatRoutes.route('/chat/conversations/<conversationId>/messages', methods=['GET'])
+def listMessages(conversationId):
+    matchingUser = findRequestUser()
+    if matchingUser is None:
+        return jsonify({'status': 'error', 'message': 'Invalid session token'}), 401
+    if conversation_service.getUserConversation(matchingUser[0], conversationId) is None:
+        return jsonify({'status': 'error', 'message': 'Conversation not found'}), 404
+
+    limit = request.args.get('limit', config.CONVERSATION_PAGE_SIZE, type=int)
+    response = conversation_service.listMessages(conversationId, limit, request.args.get('before', type=int))
+    return jsonify(response)
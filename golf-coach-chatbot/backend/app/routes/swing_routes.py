@@ -0,0 +1,70 @@
+import math
+
+from flask import Blueprint, request, jsonify
+from werkzeug.exceptions import RequestEntityTooLarge
+from app import config
+from app.services import firebase_service
+
+swingRoutes = Blueprint('swing', __name__)
+
+def readOptions():
+    """Return the JSON body, or the form fields sent alongside an uploaded ``.npy`` file."""
+    if 'keypoints' in request.files:
+        return request.form
+    body = request.get_json(silent=True)
+    if not isinstance(body, dict):
+        raise ValueError('The request body must be a JSON object')
+    return body
+
+def readSwings(swing_service, options, joints: dict):
+    """Return ``(keypoints, lengths)`` from the JSON options or an uploaded ``.npy`` file.
+
+    JSON bodies carry ``swings``, a list of (frames, joints, coords) nested lists that may
+    differ in length. Uploads carry a (swings, frames, joints, coords) or single-swing array
+    in the ``keypoints`` file field, with the other options as form fields.
+    """
+    import numpy as np
+
+    if 'keypoints' in request.files:
+        keypoints = np.load(request.files['keypoints'].stream, allow_pickle=False)
+        lengths = None
+    else:
+        swings = options.get('swings')
+        if not isinstance(swings, list) or len(swings) < 1:
+            raise ValueError('No swings were given')
+        keypoints, lengths = swing_service.padSwings(swings)
+    return swing_service.checkKeypoints(keypoints, joints), lengths
+
+@swingRoutes.route('/swing/metrics', methods=['POST'])
+def swingMetrics():
+    # Larger bodies are refused with a 413 before they are read.
+    request.max_content_length = config.SWING_MAX_BODY_BYTES
+    try:
+        options = readOptions()
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    except RequestEntityTooLarge:
+        return jsonify({'status': 'error', 'message': f'Requests are limited to {config.SWING_MAX_BODY_BYTES} bytes'}), 413
+
+    # The session is checked before the keypoints are parsed, which is the expensive part.
+    if firebase_service.findUserBySessionToken(options.get('session_token')) is None:
+        return jsonify({'status': 'error', 'message': 'Invalid session token'}), 401
+
+    # NumPy is only imported once a swing is analyzed, keeping it out of app start-up.
+    from app.services import swing_service
+
+    layoutName = options.get('joint_layout', 'coco17')
+    joints = swing_service.JOINT_LAYOUTS.get(layoutName) if isinstance(layoutName, str) else None
+    if joints is None:
+        return jsonify({'status': 'error', 'message': 'Unknown joint layout'}), 400
+    try:
+        keypoints, lengths = readSwings(swing_service, options, joints)
+        fps = float(options.get('fps', 30))
+        if not math.isfinite(fps) or fps <= 0:
+            raise ValueError('fps must be a positive number')
+        yUp = str(options.get('y_up', False)).lower() in ('1', 'true')
+        metrics = swing_service.analyzeSwings(keypoints, fps, lengths, joints, yUp)
+    except (TypeError, ValueError) as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+
+    return jsonify({'status': 'success', 'swings': swing_service.reportSwings(metrics)})
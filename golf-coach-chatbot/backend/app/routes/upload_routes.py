@@ -0,0 +1,86 @@
+from flask import Blueprint, request, jsonify
+from app import config
+from app.services import firebase_service
+from app.services import upload_service
+from app.services.upload_storage import OffsetConflict
+
+uploadRoutes = Blueprint('upload', __name__)
+
+@uploadRoutes.before_request
+def startJobQueue():
+    # The first upload request in each worker process builds its queue, which picks up
+    # uploads left behind by a worker that stopped.
+    upload_service.getJobQueue()
+
+@uploadRoutes.route('/uploads', methods=['POST'])
+def startUpload():
+    data = request.json or {}
+    matchingUser = firebase_service.findUserBySessionToken(data.get('session_token'))
+    if matchingUser is None:
+        return jsonify({'status': 'error', 'message': 'Invalid session token'}), 401
+
+    try:
+        size = int(data.get('size') or 0)
+        fps = float(data['fps']) if data.get('fps') is not None else None
+    except (TypeError, ValueError):
+        return jsonify({'status': 'error', 'message': 'size and fps must be numbers'}), 400
+    try:
+        response = upload_service.startUpload(
+            matchingUser[0], str(data.get('file_name') or ''), size,
+            data.get('content_type') or 'application/octet-stream', fps, str(data.get('y_up', False)).lower() in ('1', 'true')
+        )
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    return jsonify(response), 201
+
+def findRequestUpload(uploadId: str):
+    """Return ``(uploadId, upload)`` or an error response for the session in the query string."""
+    matchingUser = firebase_service.findUserBySessionToken(request.args.get('session_token'))
+    if matchingUser is None:
+        return None, (jsonify({'status': 'error', 'message': 'Invalid session token'}), 401)
+    matchingUpload = upload_service.getUserUpload(matchingUser[0], uploadId)
+    if matchingUpload is None:
+        return None, (jsonify({'status': 'error', 'message': 'Upload not found'}), 404)
+    return matchingUpload, None
+
+@uploadRoutes.route('/uploads/<uploadId>', methods=['PUT'])
+def uploadChunk(uploadId):
+    """Append the raw request body at ``offset``.
+
+    The body is read straight from the request stream in pieces, never as a whole. After
+    a dropped connection, GET the upload and resume from its ``received`` count.
+    """
+    matchingUpload, errorResponse = findRequestUpload(uploadId)
+    if errorResponse is not None:
+        return errorResponse
+    upload = matchingUpload[1]
+    if upload['state'] != 'uploading':
+        return jsonify({'status': 'error', 'message': 'Upload is already complete'}), 409
+
+    length = request.content_length
+    if not length:
+        return jsonify({'status': 'error', 'message': 'Chunk is empty'}), 400
+    if length > config.UPLOAD_CHUNK_SIZE:
+        return jsonify({'status': 'error', 'message': f'Chunks are limited to {config.UPLOAD_CHUNK_SIZE} bytes'}), 413
+
+    received = upload_service.receivedBytes(uploadId)
+    offset = request.args.get('offset', type=int)
+    if offset != received:
+        return jsonify({'status': 'error', 'message': 'Chunk does not start at the received offset',
+                        'received': received}), 409
+    if received + length > upload['size']:
+        return jsonify({'status': 'error', 'message': 'Chunk runs past the declared size'}), 400
+
+    try:
+        return jsonify(upload_service.receiveChunk(uploadId, upload, offset, request.stream, length))
+    except OffsetConflict as e:
+        # Another request appended at this offset between the check above and the write.
+        return jsonify({'status': 'error', 'message': 'Chunk does not start at the received offset',
+                        'received': e.received}), 409
+
+@uploadRoutes.route('/uploads/<uploadId>', methods=['GET'])
+def getUpload(uploadId):
+    matchingUpload, errorResponse = findRequestUpload(uploadId)
+    if errorResponse is not None:
+        return errorResponse
+    return jsonify(upload_service.describeUpload(*matchingUpload))
@@ -0,0 +1,344 @@
+import hashlib
+import json
+import math
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from collections import Counter, OrderedDict
+
+from app import config
+from app.utils.cache import TTLCache
+from app.utils.lazy import PerProcess
+
+SYSTEM_PROMPT = (
+    "You are a friendly, practical golf coach. Give specific, actionable advice on "
+    "swing mechanics, practice drills and course strategy. Keep answers short enough "
+    "to read on a phone."
+)
+
+def buildSystemPrompt(userData: dict) -> str:
+    profile = []
+    if userData.get('level-of-golf'):
+        profile.append(f"level of golf: {userData['level-of-golf']}")
+    if userData.get('role'):
+        profile.append(f"role: {userData['role']}")
+    if not profile:
+        return SYSTEM_PROMPT
+    return f"{SYSTEM_PROMPT} The golfer's profile is {', '.join(profile)}; tailor the advice to it."
+
+def splitTokens(text: str) -> list:
+    return re.findall(r'\S+\s*', text)
+
+
+class ModelClient:
+    """Produces the coach's reply to a list of ``{'role', 'content'}`` messages, one token at a time."""
+
+    def streamReply(self, messages: list):
+        raise NotImplementedError
+
+
+class FakeModelClient(ModelClient):
+    """Deterministic local stand-in for the hosted model.
+
+    The same messages always produce the same reply. ``firstTokenDelay`` and
+    ``tokenDelay`` (seconds) simulate model latency for offline load tests.
+    """
+
+    TOPICS = [
+        ('backswing', "Focus on a full shoulder turn while keeping your lead arm straight. "
+                      "Pause briefly at the top so your lower body can start the downswing."),
+        ('speed', "Swing speed comes from sequencing, not effort. Start the downswing with "
+                  "your hips and let your arms release late; overspeed training sticks help too."),
+        ('slice', "A slice usually means an open clubface at impact. Strengthen your grip slightly "
+                  "and feel the clubface rotate closed through the ball."),
+        ('putt', "Keep your head still and rock your shoulders like a pendulum. Practise "
+                 "three-footers until your stroke is repeatable."),
+        ('grip', "Hold the club in your fingers rather than your palms, with light pressure. "
+                 "You should see two or three knuckles on your lead hand."),
+    ]
+    DEFAULT_ADVICE = ("Let's break that down. Film your swing from down the line and face on, "
+                      "then work on one change at a time with slow, deliberate reps.")
+
+    def __init__(self, firstTokenDelay: float = 0.0, tokenDelay: float = 0.0):
+        self.firstTokenDelay = firstTokenDelay
+        self.tokenDelay = tokenDelay
+
+    def reply(self, messages: list) -> str:
+        question = next((message['content'] for message in reversed(messages) if message['role'] == 'user'), '')
+        lowered = question.lower()
+        for keyword, advice in self.TOPICS:
+            if keyword in lowered:
+                return advice
+        # Pick a stable opener so different questions still get different replies.
+        openers = ["Great question.", "Good thinking.", "Happy to help with that."]
+        return f"{openers[zlib.crc32(question.encode()) % len(openers)]} {self.DEFAULT_ADVICE}"
+
+    def streamReply(self, messages: list):
+        for index, token in enumerate(splitTokens(self.reply(messages))):
+            delay = self.firstTokenDelay if index == 0 else self.tokenDelay
+            if delay:
+                time.sleep(delay)
+            yield token
+
+
+class OpenAIModelClient(ModelClient):
+    """Streams from an OpenAI-compatible chat completions endpoint."""
+
+    def __init__(self, apiKey: str, model: str, baseUrl: str, timeout: float = 60.0):
+        import httpx
+
+        self.model = model
+        self._client = httpx.Client(
+            base_url=baseUrl,
+            headers={'Authorization': f'Bearer {apiKey}'},
+            timeout=timeout
+        )
+
+    def streamReply(self, messages: list):
+        body = {'model': self.model, 'messages': messages, 'stream': True}
+        with self._client.stream('POST', '/chat/completions', json=body) as response:
+            response.raise_for_status()
+            for line in response.iter_lines():
+                if not line.startswith('data: '):
+                    continue
+                data = line[len('data: '):]
+                if data == '[DONE]':
+                    return
+                choices = json.loads(data).get('choices') or [{}]
+                token = choices[0].get('delta', {}).get('content')
+                if token:
+                    yield token
+
+
+def createModelClient() -> ModelClient:
+    if config.CHAT_MODEL_BACKEND == 'fake':
+        return FakeModelClient(config.FAKE_MODEL_FIRST_TOKEN_DELAY, config.FAKE_MODEL_TOKEN_DELAY)
+    if config.CHAT_MODEL_BACKEND == 'openai':
+        return OpenAIModelClient(config.OPENAI_API_KEY, config.CHAT_MODEL, config.OPENAI_BASE_URL)
+    raise ValueError(f'Unknown chat model backend: {config.CHAT_MODEL_BACKEND}')
+
+_modelClient = PerProcess(createModelClient)
+
+def getModelClient() -> ModelClient:
+    return _modelClient.get()
+
+# Each open stream holds a server thread until the reply finishes, so cap how many
+# can run at once below the pool size (SERVER_THREADS) and leave the rest of the pool
+# free for the account routes.
+_streamSlots = threading.BoundedSemaphore(config.CHAT_MAX_STREAMS)
+
+def acquireStreamSlot() -> bool:
+    return _streamSlots.acquire(blocking=False)
+
+def releaseStreamSlot():
+    _streamSlots.release()
+
+def streamCoachReply(userData: dict, message: str, history: list = ()):
+    messages = [{'role': 'system', 'content': buildSystemPrompt(userData)}]
+    messages.extend(history)
+    messages.append({'role': 'user', 'content': message})
+    return getModelClient().streamReply(messages)
+
+
+# Only articles, pronouns and politeness are dropped. Question words, modals and
+# prepositions stay: "why do I slice" and "what is a slice" need different answers.
+STOP_WORDS = frozenset("""
+a an the i i'm im me my myself you your it its please
+""".split())
+
+# Only these profile fields change the advice, so only they are part of the cache key.
+PROFILE_FIELDS = ('level-of-golf', 'role')
+
+def normalizeQuestion(question: str) -> str:
+    words = re.findall(r"[a-z0-9']+", question.lower())
+    return ' '.join(word for word in words if word not in STOP_WORDS)
+
+def profileKey(userData: dict) -> str:
+    return '|'.join(str(userData.get(field) or '').strip().lower() for field in PROFILE_FIELDS)
+
+def cosineSimilarity(first: Counter, second: Counter) -> float:
+    dot = sum(count * second[word] for word, count in first.items())
+    if dot == 0:
+        return 0.0
+    norm = math.sqrt(sum(count * count for count in first.values()) * sum(count * count for count in second.values()))
+    return dot / norm
+
+
+class AnswerCache:
+    """Reuses coach answers to standalone questions for golfers with the same profile.
+
+    Questions are keyed by their normalized text plus ``PROFILE_FIELDS``. Lookups go
+    to an in-process TTL/LRU tier first, then to an optional SQLite tier at ``path``
+    that survives restarts. With ``similarity`` above zero, a miss falls back to the
+    closest recent question from the same profile by bag-of-words cosine similarity.
+    """
+
+    def __init__(self, maxSize: int, ttl: float, path: str = '', persistentSize: int = 10000,
+                 similarity: float = 0.0, similarityCandidates: int = 256):
+        self.ttl = ttl
+        self.path = path
+        self.persistentSize = persistentSize
+        self.similarity = similarity
+        self.similarityCandidates = similarityCandidates
+        self._memory = TTLCache(maxSize, ttl)
+        self._recentByProfile = {}
+        self._lock = threading.Lock()
+        self._connections = threading.local()
+        self.memoryHits = 0
+        self.persistentHits = 0
+        self.similarHits = 0
+        self.misses = 0
+        self.stores = 0
+        if path:
+            self._connect().execute(
+                'CREATE TABLE IF NOT EXISTS answers ('
+                'key TEXT PRIMARY KEY, profile TEXT, question TEXT, answer TEXT, expires_at REAL, last_used REAL)'
+            )
+            self._connect().execute('CREATE INDEX IF NOT EXISTS answers_last_used ON answers (last_used)')
+            self._connect().execute('CREATE INDEX IF NOT EXISTS answers_profile ON answers (profile, last_used)')
+
+    def _connect(self):
+        # sqlite3 connections cannot be shared between threads, so keep one per thread.
+        connection = getattr(self._connections, 'connection', None)
+        if connection is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            self._connections.connection = connection
+        return connection
+
+    def _key(self, profile: str, normalized: str) -> str:
+        return hashlib.sha256(f'{profile}\n{normalized}'.encode()).hexdigest()
+
+    def _remember(self, profile: str, normalized: str, key: str):
+        with self._lock:
+            recent = self._recentByProfile.setdefault(profile, OrderedDict())
+            recent[normalized] = key
+            recent.move_to_end(normalized)
+            while len(recent) > self.similarityCandidates:
+                recent.popitem(last=False)
+
+    def _getExact(self, key: str):
+        answer = self._memory.get(key)
+        if answer is not None:
+            return answer, 'memory'
+        if not self.path:
+            return None, None
+
+        now = time.time()
+        row = self._connect().execute(
+            'SELECT answer, expires_at FROM answers WHERE key = ?', (key,)
+        ).fetchone()
+        if row is None or row[1] <= now:
+            return None, None
+        self._connect().execute('UPDATE answers SET last_used = ? WHERE key = ?', (now, key))
+        self._memory.set(key, row[0], row[1] - now)
+        return row[0], 'persistent'
+
+    def _getSimilar(self, profile: str, normalized: str):
+        words = Counter(normalized.split())
+        if self.path and profile not in self._recentByProfile:
+            # After a restart, seed the candidates from the persistent tier.
+            rows = self._connect().execute(
+                'SELECT question, key FROM answers WHERE profile = ? AND expires_at > ? ORDER BY last_used DESC LIMIT ?',
+                (profile, time.time(), self.similarityCandidates)
+            ).fetchall()
+            for candidate, key in reversed(rows):
+                self._remember(profile, candidate, key)
+        with self._lock:
+            candidates = list(self._recentByProfile.get(profile, {}).items())
+        best, bestScore = None, self.similarity
+        for candidate, key in candidates:
+            score = cosineSimilarity(words, Counter(candidate.split()))
+            if score >= bestScore:
+                best, bestScore = key, score
+        if best is None:
+            return None
+        return self._getExact(best)[0]
+
+    def get(self, userData: dict, question: str):
+        profile, normalized = profileKey(userData), normalizeQuestion(question)
+        if not normalized:
+            return None
+        answer, tier = self._getExact(self._key(profile, normalized))
+        if answer is None and self.similarity > 0:
+            answer = self._getSimilar(profile, normalized)
+            tier = 'similar' if answer is not None else None
+
+        with self._lock:
+            if tier == 'memory':
+                self.memoryHits += 1
+            elif tier == 'persistent':
+                self.persistentHits += 1
+            elif tier == 'similar':
+                self.similarHits += 1
+            else:
+                self.misses += 1
+        return answer
+
+    def set(self, userData: dict, question: str, answer: str):
+        profile, normalized = profileKey(userData), normalizeQuestion(question)
+        if not normalized or not answer:
+            return
+        key = self._key(profile, normalized)
+        self._memory.set(key, answer)
+        if self.similarity > 0:
+            self._remember(profile, normalized, key)
+        if self.path:
+            now = time.time()
+            connection = self._connect()
+            connection.execute(
+                'INSERT OR REPLACE INTO answers (key, profile, question, answer, expires_at, last_used) '
+                'VALUES (?, ?, ?, ?, ?, ?)', (key, profile, normalized, answer, now + self.ttl, now)
+            )
+            connection.execute(
+                'DELETE FROM answers WHERE key IN (SELECT key FROM answers ORDER BY last_used DESC LIMIT -1 OFFSET ?)',
+                (self.persistentSize,)
+            )
+        with self._lock:
+            self.stores += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            hits = self.memoryHits + self.persistentHits + self.similarHits
+            lookups = hits + self.misses
+            return {
+                'hits': hits,
+                'memory-hits': self.memoryHits,
+                'persistent-hits': self.persistentHits,
+                'similar-hits': self.similarHits,
+                'misses': self.misses,
+                'hit-rate': hits / lookups if lookups else 0.0,
+                'stores': self.stores,
+                'memory-size': len(self._memory)
+            }
+
+
+def createAnswerCache() -> AnswerCache:
+    return AnswerCache(
+        config.ANSWER_CACHE_SIZE,
+        config.ANSWER_CACHE_TTL,
+        path=config.ANSWER_CACHE_PATH,
+        persistentSize=config.ANSWER_CACHE_PERSISTENT_SIZE,
+        similarity=config.ANSWER_CACHE_SIMILARITY
+    )
+
+_answerCache = PerProcess(createAnswerCache)
+
+def getCachedAnswer(userData: dict, question: str):
+    if not config.ANSWER_CACHE_ENABLED:
+        return None
+    return _answerCache.get().get(userData, question)
+
+def cacheAnswer(userData: dict, question: str, answer: str):
+    if config.ANSWER_CACHE_ENABLED:
+        _answerCache.get().set(userData, question, answer)
+
+def getAnswerCacheStats() -> dict:
+    answerCache = _answerCache.peek()
+    return answerCache.stats() if answerCache is not None else {}
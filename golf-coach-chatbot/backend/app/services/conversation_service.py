@@ -0,0 +1,140 @@
+import base64
+import json
+import re
+from datetime import datetime, timezone
+
+from app import config
+from app import database
+from app.services import firebase_service
+from app.utils.lazy import PerProcess
+
+def initialize_conversation_store() -> database.ConversationStore:
+    if config.STORAGE_BACKEND == 'firestore':
+        return database.InstrumentedStore(database.createConversationStore('firestore', firebase_service.getDb()))
+    return database.InstrumentedStore(database.createConversationStore(config.STORAGE_BACKEND))
+
+_store = PerProcess(initialize_conversation_store)
+
+def getConversationStore() -> database.ConversationStore:
+    return _store.get()
+
+def estimateTokens(text: str) -> int:
+    return len(text) // 4 + 1
+
+def encodeCursor(cursor: tuple):
+    if cursor is None:
+        return None
+    updatedAt, conversationId = cursor
+    return base64.urlsafe_b64encode(json.dumps([updatedAt.isoformat(), conversationId]).encode()).decode()
+
+def decodeCursor(text: str) -> tuple:
+    """Raises ValueError when ``text`` is not a cursor produced by ``encodeCursor``."""
+    try:
+        updatedAt, conversationId = json.loads(base64.urlsafe_b64decode(text.encode()))
+        updatedAt = datetime.fromisoformat(updatedAt)
+    except (TypeError, ValueError, json.JSONDecodeError) as e:
+        raise ValueError('Invalid cursor') from e
+    # Stored times are timezone aware and cannot be compared with naive ones.
+    if updatedAt.tzinfo is None or not isinstance(conversationId, str):
+        raise ValueError('Invalid cursor')
+    return updatedAt, conversationId
+
+def describeConversation(conversationId: str, conversation: dict) -> dict:
+    return {
+        'id': conversationId,
+        'title': conversation['title'],
+        'updated-at': conversation['updated-at'].isoformat(),
+        'message-count': conversation['message-count']
+    }
+
+def startConversation(userId: str, firstMessage: str) -> tuple:
+    now = datetime.now(timezone.utc)
+    title = firstMessage if len(firstMessage) <= 60 else firstMessage[:57].rstrip() + '...'
+    conversationId = getConversationStore().createConversation(userId, title, now)
+    return conversationId, database.newConversation(userId, title, now)
+
+def getUserConversation(userId: str, conversationId: str):
+    matchingConversation = getConversationStore().getConversation(conversationId)
+    if matchingConversation is None or matchingConversation[1]['user-id'] != userId:
+        return None
+    return matchingConversation
+
+def listConversations(userId: str, limit: int, cursor: str = None) -> dict:
+    limit = max(1, min(limit, config.CONVERSATION_MAX_PAGE_SIZE))
+    page, nextCursor = getConversationStore().listConversations(userId, limit, decodeCursor(cursor) if cursor else None)
+    return {
+        'status': 'success',
+        'conversations': [describeConversation(conversationId, conversation) for conversationId, conversation in page],
+        'next_cursor': encodeCursor(nextCursor)
+    }
+
+def listMessages(conversationId: str, limit: int, beforeIndex: int = None) -> dict:
+    limit = max(1, min(limit, config.CONVERSATION_MAX_PAGE_SIZE))
+    messages = getConversationStore().listMessages(conversationId, limit, beforeIndex)
+    return {
+        'status': 'success',
+        'messages': [
+            {'index': message['index'], 'role': message['role'], 'content': message['content'],
+             'created-at': message['created-at'].isoformat()}
+            for message in messages
+        ],
+        'next_before': messages[0]['index'] if messages and messages[0]['index'] > 0 else None
+    }
+
+def summarizeMessages(summary: str, messages: list) -> str:
+    # Extractive: keep the first sentence of each turn, dropping the oldest lines
+    # once the summary outgrows its budget. No model call is needed.
+    lines = summary.splitlines() if summary else []
+    for message in messages:
+        speaker = 'Golfer' if message['role'] == 'user' else 'Coach'
+        firstSentence = re.split(r'(?<=[.!?])\s', message['content'].strip(), maxsplit=1)[0]
+        lines.append(f'{speaker}: {firstSentence[:160]}')
+    while len(lines) > 1 and estimateTokens('\n'.join(lines)) > config.SUMMARY_TOKEN_BUDGET:
+        lines.pop(0)
+    return '\n'.join(lines)
+
+def buildContext(conversationId: str, conversation: dict) -> list:
+    """Return the history to send with the next turn.
+
+    Only the last ``CONTEXT_MAX_MESSAGES`` messages are read. The newest of them that fit
+    in the token budget are sent verbatim; anything older is represented by the rolling
+    summary stored on the conversation, which is extended only with the messages that
+    have left the window since it was last written.
+    """
+    store = getConversationStore()
+    recent = store.listMessages(conversationId, config.CONTEXT_MAX_MESSAGES)
+
+    budget = config.CONTEXT_TOKEN_BUDGET - config.SUMMARY_TOKEN_BUDGET
+    window = []
+    for message in reversed(recent):
+        cost = estimateTokens(message['content'])
+        if cost > budget:
+            break
+        window.append(message)
+        budget -= cost
+    window.reverse()
+
+    summary = conversation.get('summary', '')
+    summaryThrough = conversation.get('summary-through', 0)
+    firstInWindow = window[0]['index'] if window else conversation['message-count']
+    if firstInWindow > summaryThrough:
+        unsummarized = [message for message in recent if summaryThrough <= message['index'] < firstInWindow]
+        oldestRead = recent[0]['index'] if recent else firstInWindow
+        if oldestRead > summaryThrough:
+            # Bounded read: anything older would be trimmed from the summary anyway.
+            gap = store.listMessages(conversationId, config.CONTEXT_MAX_MESSAGES, oldestRead, summaryThrough - 1)
+            unsummarized = gap + unsummarized
+        summary = summarizeMessages(summary, unsummarized)
+        store.updateSummary(conversationId, summary, firstInWindow)
+
+    history = []
+    if summary:
+        history.append({'role': 'system', 'content': f'Earlier in this conversation:\n{summary}'})
+    history.extend({'role': message['role'], 'content': message['content']} for message in window)
+    return history
+
+def recordTurn(conversationId: str, userMessage: str, reply: str):
+    getConversationStore().appendMessages(conversationId, [
+        {'role': 'user', 'content': userMessage},
+        {'role': 'assistant', 'content': reply}
+    ], datetime.now(timezone.utc))
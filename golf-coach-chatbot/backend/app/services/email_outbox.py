@@ -0,0 +1,56 @@
+import threading
+import time
+
+from app.services.job_queue import JobQueue
+
+
+class EmailOutbox:
+    """Background queue that hands messages to a transport from a small pool of worker threads.
+
+    ``enqueue`` returns immediately. Failed sends are retried with exponential backoff
+    until ``maxAttempts`` is reached, after which the message is counted as failed.
+    """
+
+    def __init__(self, transport, workers: int = 2, maxAttempts: int = 5, retryBackoff: float = 1.0):
+        self.transport = transport
+        self.maxAttempts = maxAttempts
+        self.retryBackoff = retryBackoff
+        self.jobs = JobQueue(self._deliver, workers=workers, name='email-outbox')
+        self._lock = threading.Lock()
+        self.retries = 0
+
+    def _deliver(self, message):
+        for attempt in range(1, self.maxAttempts + 1):
+            try:
+                self.transport.send(message)
+                return
+            except Exception as e:
+                if attempt == self.maxAttempts:
+                    raise RuntimeError(f"Giving up on email to {message['to']} after {attempt} attempts") from e
+                with self._lock:
+                    self.retries += 1
+                time.sleep(self.retryBackoff * 2 ** (attempt - 1))
+
+    def enqueue(self, message):
+        self.jobs.enqueue(message)
+
+    def drain(self, timeout: float = None) -> bool:
+        """Block until every queued message has been sent or given up on."""
+        return self.jobs.drain(timeout)
+
+    def stop(self):
+        self.jobs.stop()
+
+    def stats(self) -> dict:
+        jobs = self.jobs.stats()
+        with self._lock:
+            retries = self.retries
+        return {
+            'queue-depth': jobs['queue-depth'],
+            'pending': jobs['pending'],
+            'enqueued': jobs['enqueued'],
+            'sent': jobs['completed'],
+            'failed': jobs['failed'],
+            'retries': retries,
+            'workers': jobs['workers']
+        }
@@ -1,17 +1,23 @@
 import os.path
 import base64
+import logging
 import mimetypes
-import httplib2
+import smtplib
+import threading
+import time
 
 from email.mime.multipart import MIMEMultipart
 from email.mime.base import MIMEBase
 from email.mime.text import MIMEText
 
-from google.auth.transport.requests import Request
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
-from googleapiclient.errors import HttpError
+from app import config
+from app.services.email_outbox import EmailOutbox
+from app.utils.lazy import PerProcess
+
+logger = logging.getLogger(__name__)
+
+# The Google client libraries are imported inside the functions that use them: they
+# are slow to import and only needed once an email is actually sent through Gmail.
 
 # If modifying these scopes, delete the file token.json.
 SCOPES = ["https://www.googleapis.com/auth/gmail.send"]
@@ -20,6 +26,10 @@ def getCredentials():
   """Shows basic usage of the Gmail API.
   Lists the user's Gmail labels.
   """
+  from google.auth.transport.requests import Request
+  from google.oauth2.credentials import Credentials
+  from google_auth_oauthlib.flow import InstalledAppFlow
+
   creds = None
   # The file token.json stores the user's access and refresh tokens, and is
   # created automatically when the authorization flow completes for the first
@@ -41,36 +51,133 @@ def getCredentials():
       token.write(creds.to_json())
   return creds
 
-def createMessage(sender, to, subject, msgPlain):
+def buildMimeMessage(sender, to, subject, msgPlain):
   message = MIMEMultipart("alternative")
   message["to"] = to
   message["from"] = sender
   message["subject"] = subject
 
   message.attach(MIMEText(msgPlain, 'plain'))
+  return message
+
+def createMessage(sender, to, subject, msgPlain):
+  message = buildMimeMessage(sender, to, subject, msgPlain)
 
   raw = base64.urlsafe_b64encode(message.as_bytes())
   raw = raw.decode()
   body = {"raw": raw}
   return body
 
+class GmailTransport:
+    """Sends through the Gmail API, keeping one discovery client per sending thread.
+
+    A client's httplib2 connection is not thread-safe, so each outbox worker builds its
+    own. They share one credentials object, which refreshes its own access token, so
+    token.json is only read when the first client is built.
+    """
+
+    def __init__(self):
+        self._credentials = None
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def getService(self):
+        service = getattr(self._local, "service", None)
+        if service is None:
+            from googleapiclient.discovery import build
+
+            with self._lock:
+                if self._credentials is None:
+                    self._credentials = getCredentials()
+                credentials = self._credentials
+            service = build("gmail", "v1", credentials=credentials, cache_discovery=False)
+            self._local.service = service
+        return service
+
+    def send(self, message):
+        from googleapiclient.errors import HttpError
+
+        body = {"raw": base64.urlsafe_b64encode(message.as_bytes()).decode()}
+        try:
+            return self.getService().users().messages().send(userId="me", body=body).execute()
+        except HttpError as error:
+            if error.resp.status == 401:
+                # Reload the credentials; other threads rebuild their clients when they fail too.
+                with self._lock:
+                    self._credentials = None
+                self._local.service = None
+            raise
+
+class FileTransport:
+    """Writes each message to ``directory`` as an .eml file instead of sending it."""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def send(self, message):
+        fileName = f"{time.time_ns()}-{threading.get_ident()}.eml"
+        with open(os.path.join(self.directory, fileName), "wb") as emailFile:
+            emailFile.write(message.as_bytes())
+
+class SmtpTransport:
+    def __init__(self, host: str, port: int, username: str = None, password: str = None):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+
+    def send(self, message):
+        with smtplib.SMTP(self.host, self.port) as server:
+            if self.username:
+                server.starttls()
+                server.login(self.username, self.password)
+            server.send_message(message)
+
+def createTransport(name: str):
+    if name == "gmail":
+        return GmailTransport()
+    if name == "file":
+        return FileTransport(config.EMAIL_OUTBOX_DIR)
+    if name == "smtp":
+        return SmtpTransport(config.SMTP_HOST, config.SMTP_PORT, config.SMTP_USERNAME, config.SMTP_PASSWORD)
+    raise ValueError(f"Unknown email transport: {name}")
+
+def createOutbox() -> EmailOutbox:
+    return EmailOutbox(
+        createTransport(config.EMAIL_TRANSPORT),
+        workers=config.EMAIL_WORKERS,
+        maxAttempts=config.EMAIL_MAX_ATTEMPTS,
+        retryBackoff=config.EMAIL_RETRY_BACKOFF
+    )
+
+# Worker threads do not survive a fork, so each worker process gets its own outbox.
+_outbox = PerProcess(createOutbox)
+
+def getOutbox() -> EmailOutbox:
+    return _outbox.get()
+
+def getOutboxStats() -> dict:
+    outbox = _outbox.peek()
+    return outbox.stats() if outbox is not None else {}
+
 def SendMessage(sender, to, subject, msgPlain):
-    credentials = getCredentials()
-    service = build("gmail", "v1", credentials=credentials)
-    message1 = createMessage(sender, to, subject, msgPlain)
-    sendMessageInternal(service, "me", message1)
+    # Synchronous send through the configured transport, bypassing the outbox queue.
+    getOutbox().transport.send(buildMimeMessage(sender, to, subject, msgPlain))
 
 def sendMessageInternal(service, user_id, message):
+    from googleapiclient.errors import HttpError
+
     try:
         message = (service.users().messages().send(userId=user_id, body=message).execute())
         return message
 
     except HttpError as error:
-      print('An error has occured: %s' % error)
+      logger.error('An error has occured: %s', error)
 
 def sendResetEmail(userEmail, recoveryNumber):
     to = userEmail
     sender = "golf.swing.reset.password@gmail.com"
     subject = "Golf Swing Analysis Password Recovery"
     msgPlain = f'Your recovery number is : {recoveryNumber}\nIf you did not request a password reset, no action is needed.'
-    SendMessage(sender, to, subject, msgPlain)
\ No newline at end of file
+    getOutbox().enqueue(buildMimeMessage(sender, to, subject, msgPlain))
@@ -1,38 +1,96 @@
-import firebase_admin
-from firebase_admin import credentials, firestore
-from firebase_admin.exceptions import FirebaseError
 from datetime import datetime
+import logging
 import os
 from hashlib import sha256
 import random
 import string
-from services import email_services
+from app.services import email_services
+from app.utils.cache import TTLCache
+from app.utils.lazy import PerProcess
+from app import config
+from app import database
+
+logger = logging.getLogger(__name__)
 
 def initialize_firebase():
+    # Imported here so that importing this module stays cheap and does not start gRPC.
+    import firebase_admin
+    from firebase_admin import credentials
+    from firebase_admin.exceptions import FirebaseError
+    from google.cloud import firestore
+
     try:
         # Check if already initialized
         if not firebase_admin._apps:
             basedir = os.path.abspath(os.path.dirname(__file__))
-            print(basedir)
+            logger.debug("Loading Firebase credentials from %s", basedir)
             cred = credentials.Certificate(basedir + '/private_key.json')
             firebase_admin.initialize_app(cred)
         
-        db = firestore.client()
-        print("Successfully connected to Firebase")
+        # firebase_admin.firestore.client() caches one client per app, which a forked
+        # worker would inherit along with its gRPC channel, so build one per process.
+        firebaseApp = firebase_admin.get_app()
+        db = firestore.Client(project=firebaseApp.project_id, credentials=firebaseApp.credential.get_credential())
+        logger.info("Successfully connected to Firebase")
         return db
         
     except FileNotFoundError:
-        print("Service account key file not found")
+        logger.error("Service account key file not found")
         return None
     except FirebaseError as e:
-        print(f"Firebase error: {e}")
+        logger.error("Firebase error: %s", e)
         return None
     except Exception as e:
-        print(f"Error: {e}")
+        logger.exception("Error: %s", e)
         return None
 
-# Usage
-db = initialize_firebase()
+# Usage. Clients are created on first use in each worker process, never at import time.
+_db = PerProcess(initialize_firebase)
+
+def getDb():
+    return _db.get()
+
+def initialize_store() -> database.UserStore:
+    if config.STORAGE_BACKEND == 'firestore':
+        return database.InstrumentedStore(database.createStore('firestore', getDb()))
+    return database.InstrumentedStore(database.createStore(config.STORAGE_BACKEND))
+
+_store = PerProcess(initialize_store)
+
+def getStore() -> database.UserStore:
+    return _store.get()
+
+# Maps session tokens to (user id, user data). Entries are dropped
+# whenever this process rotates a token or writes to the user document; the TTL
+# bounds how stale an entry can get when another worker does the write. Calls that
+# write to the account bypass it, so a token rotated elsewhere cannot be used to write.
+sessionCache = TTLCache(config.SESSION_CACHE_SIZE, config.SESSION_CACHE_TTL)
+
+def findUserBySessionToken(sessionToken: str, useCache: bool = True):
+    if useCache:
+        cached = sessionCache.get(sessionToken)
+        if cached is not None:
+            userId, userData = cached
+            return userId, dict(userData)
+
+    matchingUser = getStore().findUserBySessionToken(sessionToken)
+    if matchingUser is None:
+        sessionCache.invalidate(sessionToken)
+        return None
+
+    userId, userData = matchingUser
+    sessionCache.set(sessionToken, (userId, dict(userData)))
+    return userId, userData
+
+def cacheSessionToken(sessionToken: str, userId: str, userData: dict, oldSessionToken: str = None):
+    if oldSessionToken:
+        sessionCache.invalidate(oldSessionToken)
+    userData = dict(userData)
+    userData['session_token'] = sessionToken
+    sessionCache.set(sessionToken, (userId, userData))
+
+def getSessionCacheStats() -> dict:
+    return sessionCache.stats()
 
 def generateSalt(length: int = 12) -> str:
     characters = string.ascii_letters + string.digits + string.punctuation
@@ -44,8 +102,8 @@ def createAccountBasics(data: dict) -> dict:
         len(data['email']) < 1 or len(data['password']) < 8):
         return {'status': 'error', 'message': 'Invalid input data'}
     
-    matchingEmail = db.collection('user-info').where('email', '==', data['email']).get()
-    if len(matchingEmail) > 0:
+    matchingEmail = getStore().findUserByEmail(data['email'])
+    if matchingEmail is not None:
         return {'status': 'error', 'message': 'Email already exists'}
     
     salt = generateSalt()
@@ -53,8 +111,7 @@ def createAccountBasics(data: dict) -> dict:
     hashedPassword = sha256((data['password'] + salt).encode()).hexdigest()
     currentTime = datetime.now()
 
-    newAccount = db.collection('user-info').document()
-    newAccount.set({
+    getStore().createUser({
         'first-name': data['first-name'],
         'last-name': data['last-name'],
         'email': data['email'],
@@ -73,12 +130,11 @@ def createAccountBasics(data: dict) -> dict:
     return {'status': 'success', 'message': 'Account created successfully', 'session_token': sessionToken}
 
 def getAccount(email: str, password: str) -> dict:
-    matchingEmail = db.collection('user-info').where('email', '==', email).get()
-    if len(matchingEmail) == 0:
+    matchingEmail = getStore().findUserByEmail(email)
+    if matchingEmail is None:
         return {'status': 'error', 'message': 'Account not found'}
     
-    userDoc = matchingEmail[0]
-    userData = userDoc.to_dict()
+    userId, userData = matchingEmail
     salt = userData['salt']
     hashedPassword = sha256((password + salt).encode()).hexdigest()
 
@@ -86,7 +142,9 @@ def getAccount(email: str, password: str) -> dict:
         return {'status': 'error', 'message': 'Incorrect password'}
     
     sessionToken = generateSalt(30)
-    userDoc.reference.update({'session_token': sessionToken})
+    with getStore().batch() as batch:
+        batch.updateUser(userId, {'session_token': sessionToken})
+    cacheSessionToken(sessionToken, userId, userData, userData.get('session_token'))
     userData['session_token'] = sessionToken
     
     return {
@@ -96,13 +154,12 @@ def getAccount(email: str, password: str) -> dict:
     }
 
 def getAccountInfo(session_token: str) -> dict:
-    matchingToken = db.collection('user-info').where('session_token', '==', session_token).get()
+    matchingUser = findUserBySessionToken(session_token)
 
-    if len(matchingToken) == 0:
+    if matchingUser is None:
         return {'status': 'error', 'message': 'Invalid session token'}
     
-    userDoc = matchingToken[0]
-    userData = userDoc.to_dict()
+    userId, userData = matchingUser
     
     return {
         'status': 'success',
@@ -111,22 +168,23 @@ def getAccountInfo(session_token: str) -> dict:
     }
 
 def updateAccountInfo(data: dict) -> dict:
-    matchingToken = db.collection('user-info').where('session_token', '==', data["session_token"]).get()
+    matchingUser = findUserBySessionToken(data["session_token"], useCache=False)
 
-    if len(matchingToken) == 0:
+    if matchingUser is None:
         return {'status': 'error', 'message': 'Invalid session token'}
 
-    userDoc = matchingToken[0]
-    userData = userDoc.to_dict()
-    
-    for info in ["gender", "level-of-golf", "privacy", "role", "country"]:
-        userDoc.reference.update({info: data[info]})
-        userData[info] = data[info]
+    userId, userData = matchingUser
+    sessionCache.invalidate(data["session_token"])
     
-    dateTimeFormatString = "%Y-%m-%d %H:%M:%S.%f"
-    dateTimeBirthDate = datetime.strptime(data["date-of-birth"], dateTimeFormatString)
-    userDoc.reference.update({"date-of-birth": dateTimeBirthDate})
-    userData[info] = data["date-of-birth"]
+    with getStore().batch() as batch:
+        for info in ["gender", "level-of-golf", "privacy", "role", "country"]:
+            batch.updateUser(userId, {info: data[info]})
+            userData[info] = data[info]
+        
+        dateTimeFormatString = "%Y-%m-%d %H:%M:%S.%f"
+        dateTimeBirthDate = datetime.strptime(data["date-of-birth"], dateTimeFormatString)
+        batch.updateUser(userId, {"date-of-birth": dateTimeBirthDate})
+        userData["date-of-birth"] = dateTimeBirthDate
     
     return {
         "status": "success",
@@ -135,58 +193,47 @@ def updateAccountInfo(data: dict) -> dict:
     }
 
 def sendResetPasswordEmail(email: str) -> dict:
-    matchingEmail = db.collection('user-info').where('email', '==', email).get()
-    if len(matchingEmail) == 0:
-        print("Failed")
+    matchingEmail = getStore().findUserByEmail(email)
+    if matchingEmail is None:
+        logger.info("Password reset requested for unknown email")
         return {'status': 'error', 'message': 'Account not found'}
     
-    userDoc = matchingEmail[0]
-    userData = userDoc.to_dict()
+    userId, userData = matchingEmail
     email = userData["email"]
 
     resetNumber = str(random.randint(100000, 999999))
+    with getStore().batch() as batch:
+        batch.upsertResetCode(email, resetNumber, datetime.now())
     email_services.sendResetEmail(email, resetNumber)
 
-    matchingResetEmail = db.collection('reset-password').where('email', '==', email).get()
-    if len(matchingResetEmail) == 0:
-        newReset = db.collection('reset-password').document()
-        newReset.set({
-            "email": email,
-            "reset_number": resetNumber,
-            "time_requested": datetime.now()
-        })
-    else:
-        resetDoc = matchingResetEmail[0]
-        resetDoc.reference.update({"reset_number": resetNumber})
-
     return {'status': 'success', 'message': 'Email sent'}
 
 def resetPasswordCode(code: str) -> dict:
-    matchingCode = db.collection('reset-password').where('reset_number', '==', code).get()
-    if len(matchingCode) == 0:
+    matchingCode = getStore().findResetCode(code)
+    if matchingCode is None:
         return {'status': 'error', 'message': 'Account not found'}
 
-    codeDoc = matchingCode[0]
-    codeData = codeDoc.to_dict()
+    codeId, codeData = matchingCode
     
-    matchingEmail = db.collection('user-info').where('email', '==', codeData['email']).get()
-    userDoc = matchingEmail[0]
-    userData = userDoc.to_dict()
+    userId, userData = getStore().findUserByEmail(codeData['email'])
     sessionToken = generateSalt(30)
-    userDoc.reference.update({'session_token': sessionToken})
+    with getStore().batch() as batch:
+        batch.updateUser(userId, {'session_token': sessionToken})
+    cacheSessionToken(sessionToken, userId, userData, userData.get('session_token'))
 
     return {'status': 'success', 'message': 'Code approved', 'session_token': sessionToken}
 
 def resetPassword(password: str, sessionToken: str) -> dict:
-    matchingToken = db.collection('user-info').where('session_token', '==', sessionToken).get()
+    matchingUser = findUserBySessionToken(sessionToken, useCache=False)
 
-    if len(matchingToken) == 0:
+    if matchingUser is None:
         return {'status': 'error', 'message': 'Invalid session token'}
 
-    userDoc = matchingToken[0]
-    userData = userDoc.to_dict()
+    userId, userData = matchingUser
+    sessionCache.invalidate(sessionToken)
 
     salt = userData['salt']
     hashedPassword = sha256((password + salt).encode()).hexdigest()
-    userDoc.reference.update({'hashed-password': hashedPassword})
+    with getStore().batch() as batch:
+        batch.updateUser(userId, {'hashed-password': hashedPassword})
     return {'status': 'success', 'message': 'Password updated'}
\ No newline at end of file
@@ -0,0 +1,89 @@
+import logging
+import queue
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class JobQueue:
+    """Background queue that runs ``handler(job)`` on a small pool of worker threads.
+
+    Workers start on the first ``enqueue``. A handler that raises is logged and counted
+    as failed; recording the failure anywhere else is up to the handler.
+    """
+
+    def __init__(self, handler, workers: int = 2, name: str = 'jobs'):
+        self.handler = handler
+        self.workers = workers
+        self.name = name
+        self._queue = queue.Queue()
+        self._threads = []
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._pending = 0
+        self._running = 0
+        self.enqueued = 0
+        self.completed = 0
+        self.failed = 0
+
+    def _startWorkers(self):
+        for index in range(self.workers - len(self._threads)):
+            thread = threading.Thread(target=self._work, name=f'{self.name}-{index}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def enqueue(self, job):
+        with self._lock:
+            if len(self._threads) < self.workers:
+                self._startWorkers()
+            self._pending += 1
+            self.enqueued += 1
+        self._queue.put(job)
+
+    def _work(self):
+        while True:
+            job = self._queue.get()
+            if job is None:
+                return
+            with self._lock:
+                self._running += 1
+            succeeded = False
+            try:
+                self.handler(job)
+                succeeded = True
+            except Exception:
+                logger.exception("Job %r in %s failed", job, self.name)
+            with self._lock:
+                self._running -= 1
+                self._pending -= 1
+                if succeeded:
+                    self.completed += 1
+                else:
+                    self.failed += 1
+                if self._pending == 0:
+                    self._idle.notify_all()
+
+    def drain(self, timeout: float = None) -> bool:
+        """Block until every queued job has finished."""
+        with self._lock:
+            return self._idle.wait_for(lambda: self._pending == 0, timeout)
+
+    def stop(self):
+        with self._lock:
+            threads, self._threads = self._threads, []
+        for thread in threads:
+            self._queue.put(None)
+        for thread in threads:
+            thread.join()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'queue-depth': self._queue.qsize(),
+                'running': self._running,
+                'pending': self._pending,
+                'enqueued': self.enqueued,
+                'completed': self.completed,
+                'failed': self.failed,
+                'workers': len(self._threads)
+            }
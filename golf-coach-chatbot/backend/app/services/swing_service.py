@@ -0,0 +1,199 @@
+import numpy as np
+
+from app import config
+
+# COCO-17 keypoint order, as produced by MoveNet and most 2D pose models.
+COCO_17 = {
+    'nose': 0, 'left-eye': 1, 'right-eye': 2, 'left-ear': 3, 'right-ear': 4,
+    'left-shoulder': 5, 'right-shoulder': 6, 'left-elbow': 7, 'right-elbow': 8,
+    'left-wrist': 9, 'right-wrist': 10, 'left-hip': 11, 'right-hip': 12,
+    'left-knee': 13, 'right-knee': 14, 'left-ankle': 15, 'right-ankle': 16
+}
+JOINT_LAYOUTS = {'coco17': COCO_17}
+
+# Hands must move this many torso lengths from address before the swing counts as started.
+TAKEAWAY_THRESHOLD = 0.05
+
+def padSwings(swings: list) -> tuple:
+    """Stack swings of different lengths into one array, repeating each swing's last frame.
+
+    Returns ``(keypoints, lengths)`` with keypoints shaped (swings, frames, joints, coords).
+    """
+    try:
+        swingArrays = [np.asarray(swing, dtype=np.float64) for swing in swings]
+    except (TypeError, ValueError) as e:
+        raise ValueError('Each swing must be a (frames, joints, coords) list of numbers') from e
+    if not swingArrays:
+        raise ValueError('No swings were given')
+    if any(swing.ndim != 3 or len(swing) < 1 for swing in swingArrays):
+        raise ValueError('Each swing must be a (frames, joints, coords) list of numbers')
+    # Stacking would broadcast a swing with fewer joints instead of failing.
+    if any(swing.shape[1:] != swingArrays[0].shape[1:] for swing in swingArrays):
+        raise ValueError('All swings must have the same number of joints and coords')
+    lengths = np.array([len(swing) for swing in swingArrays])
+    padded = np.empty((len(swingArrays), lengths.max()) + swingArrays[0].shape[1:])
+    for index, swing in enumerate(swingArrays):
+        padded[index, :len(swing)] = swing
+        padded[index, len(swing):] = swing[-1]
+    return padded, lengths
+
+def checkKeypoints(keypoints: np.ndarray, joints: dict = COCO_17) -> np.ndarray:
+    """Return ``keypoints`` with a swing axis, raising ValueError if it is outside the accepted limits.
+
+    Only the shape is looked at, so a memory-mapped file can be checked before it is read.
+    """
+    if keypoints.ndim == 3:
+        keypoints = keypoints[None]
+    if keypoints.ndim != 4:
+        raise ValueError('Each swing must be shaped (frames, joints, coords)')
+    if keypoints.shape[0] > config.SWING_MAX_SWINGS or keypoints.shape[1] > config.SWING_MAX_FRAMES:
+        raise ValueError(f'At most {config.SWING_MAX_SWINGS} swings of {config.SWING_MAX_FRAMES} frames are accepted')
+    if keypoints.shape[2] <= max(joints.values()):
+        raise ValueError(f'The joint layout needs {max(joints.values()) + 1} joints per frame')
+    return keypoints
+
+def _angleBetween(vectors: np.ndarray, reference: np.ndarray) -> np.ndarray:
+    cosine = (vectors * reference).sum(-1) / (np.linalg.norm(vectors, axis=-1) * np.linalg.norm(reference, axis=-1) + 1e-9)
+    return np.degrees(np.arccos(np.clip(cosine, -1.0, 1.0)))
+
+def _atFrame(values: np.ndarray, frames: np.ndarray) -> np.ndarray:
+    """Pick ``values[s, frames[s]]`` for every swing s; values is (swings, frames, ...)."""
+    index = frames.reshape(frames.shape + (1,) * (values.ndim - 1))
+    return np.take_along_axis(values, index, axis=1)[:, 0]
+
+def _firstTrue(mask: np.ndarray, default: np.ndarray) -> np.ndarray:
+    return np.where(mask.any(axis=1), mask.argmax(axis=1), default)
+
+def _rotation(left: np.ndarray, right: np.ndarray, addressFrame: np.ndarray) -> np.ndarray:
+    """Turn of the left->right segment away from its address orientation, in degrees.
+
+    With 3D keypoints this is the segment's angle in the ground (x, z) plane. A 2D video has
+    no depth, so the turn is estimated from how much the segment's apparent width shrinks.
+    """
+    segment = right - left
+    if segment.shape[-1] == 3:
+        heading = np.degrees(np.arctan2(segment[..., 2], segment[..., 0]))
+        turn = heading - _atFrame(heading, addressFrame)[:, None]
+        return np.abs((turn + 180.0) % 360.0 - 180.0)
+    width = np.abs(segment[..., 0])
+    addressWidth = _atFrame(width, addressFrame)[:, None]
+    return np.degrees(np.arccos(np.clip(width / (addressWidth + 1e-9), 0.0, 1.0)))
+
+def analyzeSwings(keypoints, fps: float, lengths=None, joints: dict = COCO_17, yUp: bool = False) -> dict:
+    """Compute swing metrics for a batch of pose sequences in one pass.
+
+    ``keypoints`` is (swings, frames, joints, coords) or a single (frames, joints, coords)
+    swing, with 2D image or 3D coordinates. ``lengths`` gives each swing's real frame count
+    when the batch is padded. Image y grows downwards, so set ``yUp`` for 3D data whose
+    y axis points up. Returns a dict of arrays with one value per swing.
+    """
+    keypoints = np.asarray(keypoints, dtype=np.float64)
+    if keypoints.ndim == 3:
+        keypoints = keypoints[None]
+    if keypoints.ndim != 4 or keypoints.shape[-1] not in (2, 3):
+        raise ValueError('keypoints must be shaped (swings, frames, joints, 2 or 3)')
+    # NaN or infinite inputs would come out as NaN metrics, which JSON cannot carry.
+    if not np.isfinite(keypoints).all():
+        raise ValueError('keypoints must be finite; fill in missed joints before analysis')
+    if not np.isfinite(fps) or fps <= 0:
+        raise ValueError('fps must be a positive number')
+    swingCount, frameCount = keypoints.shape[:2]
+    lengths = np.full(swingCount, frameCount) if lengths is None else np.asarray(lengths)
+    if frameCount < 4 or lengths.min() < 4:
+        raise ValueError('a swing needs at least 4 frames')
+    lastFrame = lengths - 1
+    frames = np.arange(frameCount)
+    valid = frames[None, :] < lengths[:, None]
+
+    leftShoulder, rightShoulder = keypoints[:, :, joints['left-shoulder']], keypoints[:, :, joints['right-shoulder']]
+    leftHip, rightHip = keypoints[:, :, joints['left-hip']], keypoints[:, :, joints['right-hip']]
+    hands = (keypoints[:, :, joints['left-wrist']] + keypoints[:, :, joints['right-wrist']]) / 2
+    midShoulder, midHip = (leftShoulder + rightShoulder) / 2, (leftHip + rightHip) / 2
+
+    # Distances are scaled by torso length so metrics do not depend on camera distance.
+    torso = np.linalg.norm(midShoulder - midHip, axis=-1)
+    scale = np.nanmedian(np.where(valid, torso, np.nan), axis=1)
+    scale = np.where(scale > 0, scale, 1.0)
+    height = (hands[..., 1] if yUp else -hands[..., 1]) / scale[:, None]
+
+    velocity = np.gradient(hands, axis=1) * fps / scale[:, None, None]
+    speed = np.linalg.norm(velocity, axis=-1)
+    speed = np.where(valid, speed, 0.0)
+
+    # Address: the last still frame before the hands move away from where they started.
+    displacement = np.linalg.norm(hands - hands[:, :1], axis=-1) / scale[:, None]
+    takeaway = _firstTrue((displacement > TAKEAWAY_THRESHOLD) & valid, np.zeros(swingCount, dtype=int))
+    address = np.maximum(takeaway - 1, 0)
+    addressHeight = _atFrame(height, address)
+
+    # Top: hands at their highest before the fastest part of the downswing.
+    fastest = np.where(valid, speed, -1.0).argmax(axis=1)
+    beforeFastest = (frames[None, :] >= takeaway[:, None]) & (frames[None, :] < fastest[:, None])
+    top = np.where(beforeFastest.any(axis=1), np.where(beforeFastest, height, -np.inf).argmax(axis=1), fastest)
+
+    # Impact: the hands come back down to address height after the top.
+    afterTop = (frames[None, :] > top[:, None]) & valid
+    impact = _firstTrue(afterTop & (height <= addressHeight[:, None] + TAKEAWAY_THRESHOLD), lastFrame)
+
+    # Finish: the hands' highest point in the follow-through.
+    afterImpact = (frames[None, :] > impact[:, None]) & valid
+    finish = np.where(afterImpact.any(axis=1), np.where(afterImpact, height, -np.inf).argmax(axis=1), lastFrame)
+
+    backswingFrames = np.maximum(top - takeaway, 0)
+    downswingFrames = np.maximum(impact - top, 1)
+
+    hipTurn = _rotation(leftHip, rightHip, address)
+    shoulderTurn = _rotation(leftShoulder, rightShoulder, address)
+    vertical = np.zeros(keypoints.shape[-1])
+    vertical[1] = 1.0 if yUp else -1.0
+    spineAngle = _angleBetween(midShoulder - midHip, vertical)
+
+    impactVelocity = _atFrame(velocity, impact)
+    # Hand path at impact relative to the target line (x axis): along the ground plane for 3D
+    # data, in the image plane for 2D.
+    pathAxis = 2 if keypoints.shape[-1] == 3 else 1
+    handPath = np.degrees(np.arctan2(impactVelocity[:, pathAxis], np.abs(impactVelocity[:, 0]) + 1e-9))
+
+    return {
+        'address-frame': address,
+        'top-frame': top,
+        'impact-frame': impact,
+        'finish-frame': finish,
+        'backswing-seconds': backswingFrames / fps,
+        'downswing-seconds': downswingFrames / fps,
+        'tempo-ratio': backswingFrames / downswingFrames,
+        'hip-turn-at-top-deg': _atFrame(hipTurn, top),
+        'shoulder-turn-at-top-deg': _atFrame(shoulderTurn, top),
+        'x-factor-deg': _atFrame(shoulderTurn, top) - _atFrame(hipTurn, top),
+        'hip-turn-at-impact-deg': _atFrame(hipTurn, impact),
+        'spine-angle-at-address-deg': _atFrame(spineAngle, address),
+        'spine-angle-at-impact-deg': _atFrame(spineAngle, impact),
+        'spine-angle-change-deg': _atFrame(spineAngle, impact) - _atFrame(spineAngle, address),
+        'hand-speed-at-impact': _atFrame(speed, impact),
+        'max-hand-speed': speed.max(axis=1),
+        'hand-path-at-impact-deg': handPath
+    }
+
+def metricsForSwing(metrics: dict, index: int) -> dict:
+    return {name: values[index].item() for name, values in metrics.items()}
+
+def reportSwings(metrics: dict) -> list:
+    """Per-swing metrics and coach summary, as returned by the API."""
+    reports = []
+    for index in range(len(metrics['top-frame'])):
+        swingMetrics = metricsForSwing(metrics, index)
+        reports.append({'metrics': swingMetrics, 'summary': describeSwing(swingMetrics)})
+    return reports
+
+def describeSwing(swingMetrics: dict) -> str:
+    """One-paragraph summary the coach chat can be given as context."""
+    notes = [
+        f"Tempo {swingMetrics['tempo-ratio']:.1f}:1 "
+        f"({swingMetrics['backswing-seconds']:.2f}s back, {swingMetrics['downswing-seconds']:.2f}s down).",
+        f"Shoulder turn {swingMetrics['shoulder-turn-at-top-deg']:.0f} deg and hip turn "
+        f"{swingMetrics['hip-turn-at-top-deg']:.0f} deg at the top (X-factor {swingMetrics['x-factor-deg']:.0f} deg).",
+        f"Spine angle {swingMetrics['spine-angle-at-address-deg']:.0f} deg at address, "
+        f"{swingMetrics['spine-angle-change-deg']:+.0f} deg by impact.",
+        f"Hand path {swingMetrics['hand-path-at-impact-deg']:+.0f} deg at impact."
+    ]
+    return ' '.join(notes)
@@ -0,0 +1,205 @@
+import json
+import logging
+import math
+import os
+import shutil
+import subprocess
+import tempfile
+from datetime import datetime, timedelta, timezone
+
+from app import config
+from app import database
+from app.services import firebase_service
+from app.services.job_queue import JobQueue
+from app.services.upload_storage import UploadStorage, createUploadStorage, uploadObjectName
+from app.utils.lazy import PerProcess
+
+logger = logging.getLogger(__name__)
+
+VIDEO_EXTENSIONS = ('.mp4', '.mov', '.m4v', '.avi', '.webm')
+KEYPOINT_EXTENSIONS = ('.npy', '.json')
+
+def initialize_upload_store() -> database.UploadStore:
+    if config.STORAGE_BACKEND == 'firestore':
+        return database.InstrumentedStore(database.createUploadStore('firestore', firebase_service.getDb()))
+    return database.InstrumentedStore(database.createUploadStore(config.STORAGE_BACKEND))
+
+def initialize_upload_storage() -> UploadStorage:
+    return createUploadStorage(config.UPLOAD_STORAGE, config.UPLOAD_DIR, config.UPLOAD_BUCKET)
+
+def createJobQueue() -> JobQueue:
+    jobs = JobQueue(processUpload, workers=config.UPLOAD_WORKERS, name='swing-upload')
+    recoverUploads(jobs)
+    return jobs
+
+_store = PerProcess(initialize_upload_store)
+_storage = PerProcess(initialize_upload_storage)
+# Worker threads do not survive a fork, so each worker process gets its own queue.
+_jobs = PerProcess(createJobQueue)
+
+def getUploadStore() -> database.UploadStore:
+    return _store.get()
+
+def getUploadStorage() -> UploadStorage:
+    return _storage.get()
+
+def getJobQueue() -> JobQueue:
+    return _jobs.get()
+
+def getJobQueueStats() -> dict:
+    jobs = _jobs.peek()
+    return jobs.stats() if jobs is not None else {}
+
+def describeUpload(uploadId: str, upload: dict, received: int = None) -> dict:
+    if received is None:
+        received = getUploadStorage().received(uploadId) if upload['state'] == 'uploading' else upload['size']
+    return {
+        'status': 'success',
+        'upload_id': uploadId,
+        'state': upload['state'],
+        'file-name': upload['file-name'],
+        'size': upload['size'],
+        'received': received,
+        'chunk-size': config.UPLOAD_CHUNK_SIZE,
+        'result': upload['result'],
+        'error': upload['error'],
+        'updated-at': upload['updated-at'].isoformat()
+    }
+
+def startUpload(userId: str, fileName: str, size: int, contentType: str, fps: float = None, yUp: bool = False) -> dict:
+    """Raises ValueError when the file is of a kind that cannot be processed or is too large.
+
+    ``fps`` and ``yUp`` describe keypoint files, as for ``swing_service.analyzeSwings``.
+    """
+    extension = os.path.splitext(fileName)[1].lower()
+    if extension not in VIDEO_EXTENSIONS + KEYPOINT_EXTENSIONS:
+        raise ValueError(f'Unsupported file type: {extension or fileName}')
+    # Keypoint files are parsed whole, so they get the same cap as a /swing/metrics body.
+    maxBytes = config.SWING_MAX_BODY_BYTES if extension in KEYPOINT_EXTENSIONS else config.UPLOAD_MAX_BYTES
+    if size < 1 or size > maxBytes:
+        raise ValueError(f'{extension} uploads must be between 1 and {maxBytes} bytes')
+    if fps is not None and (not math.isfinite(fps) or fps <= 0):
+        raise ValueError('fps must be a positive number')
+
+    options = {'fps': fps, 'y-up': yUp}
+    upload = database.newUpload(userId, os.path.basename(fileName), size, contentType, options, datetime.now(timezone.utc))
+    uploadId = getUploadStore().createUpload(upload)
+    return describeUpload(uploadId, upload, 0)
+
+def getUserUpload(userId: str, uploadId: str):
+    matchingUpload = getUploadStore().getUpload(uploadId)
+    if matchingUpload is None or matchingUpload[1]['user-id'] != userId:
+        return None
+    return matchingUpload
+
+def receivedBytes(uploadId: str) -> int:
+    return getUploadStorage().received(uploadId)
+
+def receiveChunk(uploadId: str, upload: dict, offset: int, stream, length: int) -> dict:
+    """Append one chunk at ``offset``, raising ``OffsetConflict`` if the upload is not there.
+
+    The last chunk assembles the video and queues it for processing.
+    """
+    storage = getUploadStorage()
+    received = storage.appendChunk(uploadId, offset, stream, length)
+    if received < upload['size']:
+        return describeUpload(uploadId, upload, received)
+
+    # Only the request that moves the upload out of 'uploading' assembles and queues it.
+    fields = {'state': 'queued', 'object': uploadObjectName(uploadId, upload['file-name']),
+              'updated-at': datetime.now(timezone.utc)}
+    store = getUploadStore()
+    if not store.transitionUpload(uploadId, 'uploading', fields):
+        return describeUpload(*store.getUpload(uploadId))
+    try:
+        storage.finalize(uploadId, upload['file-name'])
+    except Exception:
+        store.updateUpload(uploadId, {'state': 'failed', 'error': 'The upload could not be assembled',
+                                      'updated-at': datetime.now(timezone.utc)})
+        raise
+    getJobQueue().enqueue(uploadId)
+    return describeUpload(uploadId, dict(upload, **fields), received)
+
+def analyzeKeypointFile(path: str, options: dict) -> dict:
+    """Swing metrics for an .npy array or a JSON file of swings, as taken by /swing/metrics."""
+    import numpy as np
+    from app.services import swing_service
+
+    fps, yUp = options.get('fps'), options.get('y-up', False)
+    if path.endswith('.npy'):
+        # Memory-mapped, so an oversized array is refused from its header before it is read.
+        keypoints, lengths = np.load(path, mmap_mode='r', allow_pickle=False), None
+    else:
+        with open(path) as keypointFile:
+            data = json.load(keypointFile)
+        swings = data.get('swings') if isinstance(data, dict) else data
+        if isinstance(data, dict):
+            fps, yUp = data.get('fps', fps), data.get('y_up', yUp)
+        keypoints, lengths = swing_service.padSwings(swings if isinstance(swings, list) else [])
+    keypoints = swing_service.checkKeypoints(keypoints)
+    metrics = swing_service.analyzeSwings(keypoints, fps or config.UPLOAD_FRAME_RATE, lengths, yUp=bool(yUp))
+    return {'swings': swing_service.reportSwings(metrics)}
+
+def extractFrames(uploadId: str, path: str) -> dict:
+    """Sample the video to JPEG frames with ffmpeg and store them with the upload's results."""
+    storage = getUploadStorage()
+    frameDirectory = tempfile.mkdtemp(prefix='swing-frames-')
+    try:
+        subprocess.run([
+            config.FFMPEG_PATH, '-nostdin', '-loglevel', 'error', '-i', path,
+            '-vf', f'fps={config.UPLOAD_FRAME_RATE}', '-frames:v', str(config.SWING_MAX_FRAMES),
+            '-q:v', '4', os.path.join(frameDirectory, 'frame-%05d.jpg')
+        ], check=True, capture_output=True, timeout=600)
+        frameNames = sorted(os.listdir(frameDirectory))
+        for frameName in frameNames:
+            with open(os.path.join(frameDirectory, frameName), 'rb') as frameFile:
+                storage.writeResult(uploadId, f'frames/{frameName}', frameFile.read())
+    finally:
+        shutil.rmtree(frameDirectory, ignore_errors=True)
+    return {'frames': len(frameNames), 'frame-rate': config.UPLOAD_FRAME_RATE, 'frames-prefix': f'results/{uploadId}/frames/'}
+
+def recoverUploads(jobs: JobQueue):
+    """Pick up uploads left behind by a worker process that stopped.
+
+    Jobs live only in the memory of the process that queued them. Uploads still queued
+    after ``UPLOAD_STALE_SECONDS`` are queued again here; ones that were mid-processing
+    are failed, since running them again could bring down this worker too.
+    """
+    store = getUploadStore()
+    now = datetime.now(timezone.utc)
+    staleUploads = store.findStaleUploads(('queued', 'processing'), now - timedelta(seconds=config.UPLOAD_STALE_SECONDS))
+    for uploadId, upload in staleUploads:
+        if upload['state'] == 'queued':
+            jobs.enqueue(uploadId)
+        else:
+            store.transitionUpload(uploadId, 'processing', {
+                'state': 'failed', 'error': 'Processing was interrupted, please upload the file again', 'updated-at': now
+            })
+    if staleUploads:
+        logger.warning("Recovered %d stale uploads", len(staleUploads))
+
+def processUpload(uploadId: str):
+    """Job handler: extract frames from a video, or swing metrics from a keypoint file."""
+    store = getUploadStore()
+    storage = getUploadStorage()
+    # Recovery can queue an upload in more than one process; only one job claims it.
+    if not store.transitionUpload(uploadId, 'queued', {'state': 'processing', 'updated-at': datetime.now(timezone.utc)}):
+        return
+    try:
+        upload = store.getUpload(uploadId)[1]
+        with storage.localCopy(upload['object']) as path:
+            if upload['object'].endswith(KEYPOINT_EXTENSIONS):
+                result = analyzeKeypointFile(path, upload['options'])
+            else:
+                result = extractFrames(uploadId, path)
+        result['object'] = storage.writeResult(uploadId, 'result.json', json.dumps(result).encode())
+    except Exception as e:
+        if isinstance(e, ValueError):
+            error = str(e)
+        elif isinstance(e, FileNotFoundError) and e.filename == config.FFMPEG_PATH:
+            error = 'Frame extraction is not available on this server'
+        else:
+            error = 'The upload could not be processed'
+        store.updateUpload(uploadId, {'state': 'failed', 'error': error, 'updated-at': datetime.now(timezone.utc)})
+        raise
+    store.updateUpload(uploadId, {'state': 'done', 'result': result, 'updated-at': datetime.now(timezone.utc)})
@@ -0,0 +1,187 @@
+import contextlib
+import fcntl
+import os
+import shutil
+import tempfile
+
+# Request bodies are copied in pieces of this size, so a chunk is never held in memory whole.
+COPY_BUFFER_SIZE = 1024 * 1024
+
+
+class OffsetConflict(Exception):
+    """A chunk did not start where the upload ends, usually because another request got there first."""
+
+    def __init__(self, received: int):
+        super().__init__(f'Chunk does not start at the received offset {received}')
+        self.received = received
+
+
+class UploadStorage:
+    """Where upload bytes and processing results are kept.
+
+    Chunks arrive in order: a chunk is only appended once its offset matches what
+    ``received`` reports, which is what lets a client resume after a dropped connection.
+    The offset is checked again as the chunk is written, so of two requests sending the
+    same offset, even from different worker processes, only one is appended.
+    """
+
+    def received(self, uploadId: str) -> int:
+        raise NotImplementedError
+
+    def appendChunk(self, uploadId: str, offset: int, stream, length: int) -> int:
+        """Copy ``length`` bytes from ``stream`` onto the upload and return the new size.
+
+        Raises ``OffsetConflict`` when the upload does not currently end at ``offset``.
+        """
+        raise NotImplementedError
+
+    def finalize(self, uploadId: str, fileName: str) -> str:
+        """Turn the received chunks into one object and return its name."""
+        raise NotImplementedError
+
+    def localCopy(self, objectName: str):
+        """Context manager yielding a local file path for ``objectName``."""
+        raise NotImplementedError
+
+    def writeResult(self, uploadId: str, name: str, data: bytes) -> str:
+        raise NotImplementedError
+
+
+def uploadObjectName(uploadId: str, fileName: str) -> str:
+    extension = os.path.splitext(fileName)[1].lower()
+    return f'files/{uploadId}{extension}'
+
+
+class LocalUploadStorage(UploadStorage):
+    """Keeps uploads under ``directory``: partial/ while uploading, then files/ and results/."""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        for subdirectory in ('partial', 'files', 'results'):
+            os.makedirs(os.path.join(directory, subdirectory), exist_ok=True)
+
+    def _partialPath(self, uploadId: str) -> str:
+        return os.path.join(self.directory, 'partial', uploadId)
+
+    def received(self, uploadId: str) -> int:
+        try:
+            return os.path.getsize(self._partialPath(uploadId))
+        except FileNotFoundError:
+            return 0
+
+    def appendChunk(self, uploadId: str, offset: int, stream, length: int) -> int:
+        # Only the first chunk may create the file, so a late chunk cannot leave an empty
+        # partial file behind after the upload is finalized.
+        try:
+            partialFile = open(self._partialPath(uploadId), 'ab' if offset == 0 else 'r+b')
+        except FileNotFoundError:
+            raise OffsetConflict(0) from None
+        with partialFile:
+            # An exclusive flock serializes writers across threads and worker processes.
+            fcntl.flock(partialFile, fcntl.LOCK_EX)
+            received = partialFile.seek(0, os.SEEK_END)
+            if received != offset:
+                raise OffsetConflict(received)
+            remaining = length
+            while remaining > 0:
+                piece = stream.read(min(COPY_BUFFER_SIZE, remaining))
+                if not piece:
+                    break
+                partialFile.write(piece)
+                remaining -= len(piece)
+            return partialFile.tell()
+
+    def finalize(self, uploadId: str, fileName: str) -> str:
+        objectName = uploadObjectName(uploadId, fileName)
+        os.replace(self._partialPath(uploadId), os.path.join(self.directory, objectName))
+        return objectName
+
+    @contextlib.contextmanager
+    def localCopy(self, objectName: str):
+        yield os.path.join(self.directory, objectName)
+
+    def writeResult(self, uploadId: str, name: str, data: bytes) -> str:
+        objectName = f'results/{uploadId}/{name}'
+        path = os.path.join(self.directory, objectName)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as resultFile:
+            resultFile.write(data)
+        return objectName
+
+
+class GcsUploadStorage(UploadStorage):
+    """Keeps uploads in a Cloud Storage bucket.
+
+    Objects cannot be appended to, so each chunk is written as its own part object under
+    ``partial/<upload id>/`` and the parts are composed into one object on completion.
+    """
+
+    # Cloud Storage composes at most 32 source objects per request.
+    COMPOSE_LIMIT = 32
+
+    def __init__(self, bucketName: str):
+        from google.cloud import storage
+
+        self.bucket = storage.Client().bucket(bucketName)
+
+    def _parts(self, uploadId: str) -> list:
+        return sorted(self.bucket.list_blobs(prefix=f'partial/{uploadId}/'), key=lambda blob: blob.name)
+
+    def received(self, uploadId: str) -> int:
+        return sum(blob.size for blob in self._parts(uploadId))
+
+    def appendChunk(self, uploadId: str, offset: int, stream, length: int) -> int:
+        from google.api_core.exceptions import PreconditionFailed
+
+        received = self.received(uploadId)
+        if received != offset:
+            raise OffsetConflict(received)
+        # Part names sort by offset, so listing returns them in upload order. Generation 0
+        # means the part must not exist yet, so two writers of one offset cannot both succeed.
+        blob = self.bucket.blob(f'partial/{uploadId}/{offset:015d}')
+        try:
+            blob.upload_from_file(stream, size=length, content_type='application/octet-stream',
+                                  if_generation_match=0)
+        except PreconditionFailed:
+            raise OffsetConflict(self.received(uploadId)) from None
+        return offset + length
+
+    def finalize(self, uploadId: str, fileName: str) -> str:
+        parts = self._parts(uploadId)
+        objectName = uploadObjectName(uploadId, fileName)
+        sources, intermediates = parts, []
+        while len(sources) > self.COMPOSE_LIMIT:
+            composed = []
+            for start in range(0, len(sources), self.COMPOSE_LIMIT):
+                blob = self.bucket.blob(f'composing/{uploadId}/{len(intermediates):06d}')
+                blob.compose(sources[start:start + self.COMPOSE_LIMIT])
+                intermediates.append(blob)
+                composed.append(blob)
+            sources = composed
+        self.bucket.blob(objectName).compose(sources)
+        for blob in parts + intermediates:
+            blob.delete()
+        return objectName
+
+    @contextlib.contextmanager
+    def localCopy(self, objectName: str):
+        directory = tempfile.mkdtemp(prefix='swing-upload-')
+        try:
+            path = os.path.join(directory, os.path.basename(objectName))
+            self.bucket.blob(objectName).download_to_filename(path)
+            yield path
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+
+    def writeResult(self, uploadId: str, name: str, data: bytes) -> str:
+        objectName = f'results/{uploadId}/{name}'
+        self.bucket.blob(objectName).upload_from_string(data)
+        return objectName
+
+
+def createUploadStorage(name: str, directory: str = None, bucketName: str = None) -> UploadStorage:
+    if name == 'local':
+        return LocalUploadStorage(directory)
+    if name == 'gcs':
+        return GcsUploadStorage(bucketName)
+    raise ValueError(f'Unknown upload storage: {name}')
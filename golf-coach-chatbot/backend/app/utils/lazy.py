@@ -0,0 +1,33 @@
+import os
+import threading
+
+
+class PerProcess:
+    """Builds a value with ``factory`` on first use, and again in any forked child.
+
+    Clients holding sockets, gRPC channels or threads must not be shared across a fork,
+    so a child process that finds a value created by its parent builds its own instead.
+    """
+
+    def __init__(self, factory):
+        self.factory = factory
+        self._value = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._value = self.factory()
+                    self._pid = os.getpid()
+        return self._value
+
+    def peek(self):
+        """Return the value if this process already built it, without building it."""
+        return self._value if self._pid == os.getpid() else None
+
+    def reset(self):
+        with self._lock:
+            self._value = None
+            self._pid = None
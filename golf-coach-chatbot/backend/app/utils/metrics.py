@@ -0,0 +1,115 @@
+import bisect
+import threading
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+def formatLabels(labelNames: tuple, labels: tuple, extra: str = '') -> str:
+    pairs = [f'{name}="{escapeLabel(value)}"' for name, value in zip(labelNames, labels)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+def escapeLabel(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labelNames: tuple = ()):
+        self.name = name
+        self.help = help
+        self.labelNames = labelNames
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels: tuple = (), amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> list:
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} counter']
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f'{self.name}{formatLabels(self.labelNames, labels)} {value}')
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labelNames: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelNames = labelNames
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels: tuple, value: float):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> list:
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            for labels, (bucketCounts, total, count) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, bucketCount in zip(self.buckets + (float('inf'),), bucketCounts):
+                    cumulative += bucketCount
+                    upper = '+Inf' if bound == float('inf') else repr(bound)
+                    bucketLabels = formatLabels(self.labelNames, labels, 'le="' + upper + '"')
+                    lines.append(f'{self.name}_bucket{bucketLabels} {cumulative}')
+                lines.append(f'{self.name}_sum{formatLabels(self.labelNames, labels)} {total}')
+                lines.append(f'{self.name}_count{formatLabels(self.labelNames, labels)} {count}')
+        return lines
+
+
+class Registry:
+    """Process-local metrics rendered in the Prometheus text exposition format.
+
+    Collectors are callables returning ``(name, type, help, {labels: value})`` tuples;
+    they are read at scrape time, which suits counters other modules already keep.
+    """
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def counter(self, name: str, help: str, labelNames: tuple = ()) -> Counter:
+        metric = Counter(name, help, labelNames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, help: str, labelNames: tuple = (), buckets: tuple = DEFAULT_BUCKETS) -> Histogram:
+        metric = Histogram(name, help, labelNames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def addCollector(self, collector):
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for collector in self._collectors:
+            for name, metricType, help, samples in collector():
+                lines.append(f'# HELP {name} {help}')
+                lines.append(f'# TYPE {name} {metricType}')
+                for labels, value in sorted(samples.items()):
+                    lines.append(f'{name}{formatLabels(tuple(key for key, _ in labels), tuple(v for _, v in labels))} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+requestDuration = registry.histogram(
+    'http_request_duration_seconds', 'Time to produce a response, by route.', ('route', 'method', 'status'))
+backendOperationDuration = registry.histogram(
+    'backend_operation_duration_seconds', 'Duration of storage operations.', ('operation', 'kind'))
+backendOperationsPerRequest = registry.histogram(
+    'backend_operations_per_request', 'Storage operations issued while handling one request.', ('route', 'kind'),
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21))
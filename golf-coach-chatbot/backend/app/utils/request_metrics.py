@@ -0,0 +1,96 @@
+import json
+import logging
+import time
+
+from flask import Response, g, request
+
+from app import config
+from app import database
+from app.utils import metrics
+
+slowRequestLogger = logging.getLogger('app.slow_requests')
+
+def summarizeOperations(operations: list) -> dict:
+    breakdown = {}
+    for operation, kind, seconds in operations:
+        entry = breakdown.setdefault(operation, {'kind': kind, 'calls': 0, 'ms': 0.0})
+        entry['calls'] += 1
+        entry['ms'] += seconds * 1000
+    return breakdown
+
+def startRequest():
+    database.beginRpcCount()
+    g.requestStarted = time.perf_counter()
+
+def finishRequest(response):
+    elapsed = time.perf_counter() - g.get('requestStarted', time.perf_counter())
+    route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+    rpcCount = database.getRpcCount()
+    operations = database.getOperations()
+
+    metrics.requestDuration.observe((route, request.method, str(response.status_code)), elapsed)
+    for kind in ('read', 'write', 'query'):
+        kindCount = sum(1 for _, operationKind, _ in operations if operationKind == kind)
+        metrics.backendOperationsPerRequest.observe((route, kind), kindCount)
+    database.recordEndpointRpcs(request.endpoint or 'unknown', rpcCount)
+    response.headers['X-Backend-RPCs'] = str(rpcCount)
+
+    if config.SLOW_REQUEST_MS and elapsed * 1000 >= config.SLOW_REQUEST_MS:
+        slowRequestLogger.warning('Slow request %s', json.dumps({
+            'method': request.method,
+            'route': route,
+            'status': response.status_code,
+            'ms': round(elapsed * 1000, 1),
+            'rpcs': rpcCount,
+            'backend-ms': round(sum(seconds for _, _, seconds in operations) * 1000, 1),
+            'operations': summarizeOperations(operations)
+        }))
+    return response
+
+def collectServiceStats():
+    from app.services import chatbot_services, email_services, firebase_service, upload_service
+
+    sessionCache = firebase_service.getSessionCacheStats()
+    outbox = email_services.getOutboxStats()
+    answerCache = chatbot_services.getAnswerCacheStats()
+    uploadJobs = upload_service.getJobQueueStats()
+    yield ('session_cache_lookups_total', 'counter', 'Session cache lookups by result.', {
+        (('result', 'hit'),): sessionCache['hits'],
+        (('result', 'miss'),): sessionCache['misses']
+    })
+    yield ('session_cache_entries', 'gauge', 'Entries in the session cache.', {(): sessionCache['size']})
+    if outbox:
+        yield ('email_outbox_queue_depth', 'gauge', 'Emails waiting for a worker.', {(): outbox['queue-depth']})
+        yield ('email_outbox_messages_total', 'counter', 'Emails by outcome.', {
+            (('outcome', 'sent'),): outbox['sent'],
+            (('outcome', 'failed'),): outbox['failed'],
+            (('outcome', 'retried'),): outbox['retries']
+        })
+    if answerCache:
+        yield ('answer_cache_lookups_total', 'counter', 'Answer cache lookups by result.', {
+            (('result', 'memory-hit'),): answerCache['memory-hits'],
+            (('result', 'persistent-hit'),): answerCache['persistent-hits'],
+            (('result', 'similar-hit'),): answerCache['similar-hits'],
+            (('result', 'miss'),): answerCache['misses']
+        })
+    if uploadJobs:
+        yield ('upload_jobs_queue_depth', 'gauge', 'Upload processing jobs waiting for a worker.', {(): uploadJobs['queue-depth']})
+        yield ('upload_jobs_total', 'counter', 'Upload processing jobs by outcome.', {
+            (('outcome', 'completed'),): uploadJobs['completed'],
+            (('outcome', 'failed'),): uploadJobs['failed']
+        })
+
+def renderMetrics():
+    return Response(metrics.registry.render(), mimetype='text/plain; version=0.0.4')
+
+def instrumentApp(app):
+    """Record per-route latency and storage usage for every request, and serve them at /metrics.
+
+    Metrics are per process; with several workers, scrape each one or aggregate upstream.
+    Streaming responses are timed until their headers are returned.
+    """
+    app.before_request(startRequest)
+    app.after_request(finishRequest)
+    app.add_url_rule('/metrics', 'metrics', renderMetrics, methods=['GET'])
+
+metrics.registry.addCollector(collectServiceStats)
@@ -0,0 +1,108 @@
+"""Cold-start report for the backend.
+
+Starts a fresh interpreter with ``-X importtime``, builds the app, serves one request,
+and reports per-module import cost plus the time to first request::
+
+    python -m app.utils.startup_report --json startup.json --first-request-budget-ms 1500
+
+Exits with status 1 when a budget is exceeded, so it can gate CI.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+PROBE = """
+import json, time
+started = time.perf_counter()
+from app import createApp
+imported = time.perf_counter()
+app = createApp()
+created = time.perf_counter()
+response = app.test_client().get('/account/info', query_string={'session_token': 'startup-probe'})
+served = time.perf_counter()
+print(json.dumps({
+    'import-ms': (imported - started) * 1000,
+    'create-app-ms': (created - imported) * 1000,
+    'first-request-ms': (served - created) * 1000,
+    'time-to-first-request-ms': (served - started) * 1000,
+    'first-request-status': response.status_code
+}))
+"""
+
+def parseImportTimes(stderr: str) -> list:
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        parts = line[len('import time:'):].split('|')
+        if len(parts) != 3:
+            continue
+        try:
+            selfUs, cumulativeUs = int(parts[0]), int(parts[1])
+        except ValueError:
+            # Column header line.
+            continue
+        name = parts[2][1:]
+        modules.append({
+            'module': name.strip(),
+            'depth': (len(name) - len(name.lstrip())) // 2,
+            'self-ms': selfUs / 1000,
+            'cumulative-ms': cumulativeUs / 1000
+        })
+    return modules
+
+def runProbe(backend: str) -> dict:
+    env = dict(os.environ, STORAGE_BACKEND=backend)
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', PROBE],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f'Startup probe failed:\n{result.stderr[-2000:]}')
+
+    timings = json.loads(result.stdout.strip().splitlines()[-1])
+    modules = parseImportTimes(result.stderr)
+    # The app package's direct imports show which dependency dominates its import time.
+    shallowImports = [module for module in modules if module['depth'] <= 1]
+    timings['modules-imported'] = len(modules)
+    timings['slowest-imports'] = sorted(shallowImports, key=lambda module: module['cumulative-ms'], reverse=True)
+    return timings
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--backend', default='memory', help='STORAGE_BACKEND to start with')
+    parser.add_argument('--top', type=int, default=15, help='number of slowest imports to list')
+    parser.add_argument('--json', help='also write the full report to this file')
+    parser.add_argument('--import-budget-ms', type=float)
+    parser.add_argument('--first-request-budget-ms', type=float)
+    args = parser.parse_args(argv)
+
+    report = runProbe(args.backend)
+    if args.json:
+        with open(args.json, 'w') as reportFile:
+            json.dump(report, reportFile, indent=2)
+
+    print(f"import app:            {report['import-ms']:8.1f} ms ({report['modules-imported']} modules)")
+    print(f"createApp():           {report['create-app-ms']:8.1f} ms")
+    print(f"first request:         {report['first-request-ms']:8.1f} ms (status {report['first-request-status']})")
+    print(f"time to first request: {report['time-to-first-request-ms']:8.1f} ms")
+    print('slowest imports:')
+    for module in report['slowest-imports'][:args.top]:
+        print(f"  {module['cumulative-ms']:8.1f} ms  {module['module']}")
+
+    overBudget = []
+    if args.import_budget_ms is not None and report['import-ms'] > args.import_budget_ms:
+        overBudget.append(f"import took {report['import-ms']:.1f} ms (budget {args.import_budget_ms} ms)")
+    if args.first_request_budget_ms is not None and report['time-to-first-request-ms'] > args.first_request_budget_ms:
+        overBudget.append(f"first request took {report['time-to-first-request-ms']:.1f} ms "
+                          f"(budget {args.first_request_budget_ms} ms)")
+    for message in overBudget:
+        print(f'OVER BUDGET: {message}')
+    return 1 if overBudget else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,297 @@
+"""Load test for the account API against the in-memory storage backend.
+
+Starts the app on a local port (or targets ``--target``), seeds golfers, then replays a
+weighted mix of account operations from ``--concurrency`` threads::
+
+    python -m benchmarks.account_bench --concurrency 16 --duration 20 --json results.json
+    python -m benchmarks.account_bench --json new.json --compare results.json
+
+Reports throughput, p50/p95/p99 latency and backend round trips per request (from the
+X-Backend-RPCs header) for each operation and overall.
+"""
+import argparse
+import http.client
+import json
+import logging
+import math
+import os
+import random
+import sys
+import threading
+import time
+import urllib.parse
+from datetime import datetime
+
+# Must be set before the app modules read their configuration.
+os.environ.setdefault('STORAGE_BACKEND', 'memory')
+os.environ.setdefault('SLOW_REQUEST_MS', '0')
+
+DEFAULT_MIX = 'login=20,info=45,update=15,signup=5,reset=15'
+# A running server sends real reset emails to the seeded addresses, so against --target
+# resets are only run when --mix asks for them.
+TARGET_MIX = 'login=20,info=45,update=15,signup=5'
+PASSWORD = 'benchmark-password'
+
+
+class CaptureTransport:
+    """Keeps the last reset email per recipient so the benchmark can finish the reset flow."""
+
+    def __init__(self):
+        self.lastMessage = {}
+        self._lock = threading.Lock()
+
+    def send(self, message):
+        body = message.get_payload()[0].get_payload(decode=True).decode()
+        with self._lock:
+            self.lastMessage[message['to']] = body
+
+    def resetCode(self, email: str, timeout: float = 5.0):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            with self._lock:
+                body = self.lastMessage.pop(email, None)
+            if body is not None:
+                return body.split(':', 1)[1].split()[0]
+            time.sleep(0.001)
+        return None
+
+
+def startLocalServer(captureTransport: CaptureTransport) -> str:
+    from werkzeug.serving import make_server
+    from app import createApp
+    from app.services import email_services
+    from app.services.email_outbox import EmailOutbox
+    from app.utils.lazy import PerProcess
+
+    email_services._outbox = PerProcess(lambda: EmailOutbox(captureTransport, workers=4))
+    # The development server logs every request, which would swamp the report.
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+    server = make_server('127.0.0.1', 0, createApp(), threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f'http://127.0.0.1:{server.server_port}'
+
+
+class Client:
+    def __init__(self, target: str):
+        parsed = urllib.parse.urlsplit(target)
+        self.host, self.port = parsed.hostname, parsed.port or 80
+        self.connection = None
+
+    def request(self, method: str, path: str, params: dict = None, body: dict = None) -> tuple:
+        if params:
+            path = f'{path}?{urllib.parse.urlencode(params)}'
+        headers = {'Content-Type': 'application/json'} if body is not None else {}
+        payload = json.dumps(body) if body is not None else None
+        for attempt in range(2):
+            if self.connection is None:
+                self.connection = http.client.HTTPConnection(self.host, self.port, timeout=30)
+            try:
+                self.connection.request(method, path, body=payload, headers=headers)
+                response = self.connection.getresponse()
+                data = json.loads(response.read() or b'null')
+                return response.status, data, int(response.getheader('X-Backend-RPCs') or 0)
+            except (http.client.HTTPException, ConnectionError):
+                self.connection.close()
+                self.connection = None
+                if attempt == 1:
+                    raise
+
+
+class Golfer:
+    def __init__(self, email: str):
+        self.email = email
+        self.sessionToken = None
+
+
+class Worker:
+    def __init__(self, index: int, target: str, golfers: list, mix: list, seed: int, captureTransport):
+        self.index = index
+        self.client = Client(target)
+        self.golfers = golfers
+        self.mix = mix
+        self.random = random.Random(seed + index)
+        self.captureTransport = captureTransport
+        self.samples = []
+        self.signups = 0
+
+    def call(self, operation: str, method: str, path: str, params: dict = None, body: dict = None) -> dict:
+        started = time.perf_counter()
+        try:
+            status, data, rpcs = self.client.request(method, path, params, body)
+            ok = status == 200 and isinstance(data, dict) and data.get('status') == 'success'
+        except Exception:
+            status, data, rpcs, ok = 0, None, 0, False
+        self.samples.append((operation, time.perf_counter() - started, ok, rpcs))
+        return data if ok else None
+
+    def login(self, golfer: Golfer):
+        data = self.call('login', 'GET', '/account', params={'email': golfer.email, 'password': PASSWORD})
+        if data:
+            golfer.sessionToken = data['user-info']['session_token']
+
+    def info(self, golfer: Golfer):
+        self.call('info', 'GET', '/account/info', params={'session_token': golfer.sessionToken})
+
+    def update(self, golfer: Golfer):
+        self.call('update', 'POST', '/account/update', body={
+            'session_token': golfer.sessionToken,
+            'gender': self.random.choice(['male', 'female', 'other']),
+            'level-of-golf': self.random.choice(['beginner', 'intermediate', 'advanced']),
+            'privacy': self.random.choice(['public', 'private']),
+            'role': self.random.choice(['player', 'coach']),
+            'country': self.random.choice(['Canada', 'Ireland', 'Japan']),
+            'date-of-birth': '1990-05-17 00:00:00.000'
+        })
+
+    def signup(self, golfer: Golfer):
+        self.signups += 1
+        newGolfer = Golfer(f'bench-{self.index}-new-{self.signups}-{time.time_ns()}@example.com')
+        data = self.call('signup', 'POST', '/account/part1', body={
+            'first-name': 'Bench', 'last-name': 'Golfer', 'email': newGolfer.email, 'password': PASSWORD
+        })
+        if data:
+            newGolfer.sessionToken = data['session_token']
+            self.golfers.append(newGolfer)
+
+    def reset(self, golfer: Golfer):
+        if not self.call('reset', 'POST', '/account/reset', body={'email': golfer.email}):
+            return
+        if self.captureTransport is None:
+            return
+        code = self.captureTransport.resetCode(golfer.email)
+        data = self.call('reset-code', 'POST', '/account/resetCode', body={'code': code})
+        if data:
+            golfer.sessionToken = data['session_token']
+            self.call('reset-password', 'POST', '/account/resetPassword',
+                      body={'password': PASSWORD, 'session_token': golfer.sessionToken})
+
+    def run(self, deadline: float, requestLimit: int):
+        operations, weights = zip(*self.mix)
+        while time.perf_counter() < deadline and (not requestLimit or len(self.samples) < requestLimit):
+            operation = self.random.choices(operations, weights)[0]
+            getattr(self, operation)(self.random.choice(self.golfers))
+
+
+def seedGolfers(target: str, workers: int, golfersPerWorker: int) -> list:
+    client = Client(target)
+    pools = []
+    for workerIndex in range(workers):
+        pool = []
+        for golferIndex in range(golfersPerWorker):
+            golfer = Golfer(f'bench-{workerIndex}-{golferIndex}-{time.time_ns()}@example.com')
+            status, data, rpcs = client.request('POST', '/account/part1', body={
+                'first-name': 'Bench', 'last-name': 'Golfer', 'email': golfer.email, 'password': PASSWORD
+            })
+            if not data or data.get('status') != 'success':
+                raise RuntimeError(f'Could not seed {golfer.email}: {data}')
+            golfer.sessionToken = data['session_token']
+            pool.append(golfer)
+        pools.append(pool)
+    return pools
+
+def percentile(sortedValues: list, fraction: float) -> float:
+    if not sortedValues:
+        return 0.0
+    # Nearest-rank percentile.
+    rank = max(1, math.ceil(fraction * len(sortedValues)))
+    return sortedValues[rank - 1]
+
+def summarize(samples: list, elapsed: float) -> dict:
+    latencies = sorted(latency for _, latency, _, _ in samples)
+    return {
+        'requests': len(samples),
+        'errors': sum(1 for _, _, ok, _ in samples if not ok),
+        'throughput-rps': len(samples) / elapsed if elapsed else 0.0,
+        'p50-ms': percentile(latencies, 0.50) * 1000,
+        'p95-ms': percentile(latencies, 0.95) * 1000,
+        'p99-ms': percentile(latencies, 0.99) * 1000,
+        'mean-rpcs': sum(rpcs for _, _, _, rpcs in samples) / len(samples) if samples else 0.0
+    }
+
+def parseMix(text: str) -> list:
+    mix = []
+    for part in text.split(','):
+        operation, weight = part.split('=')
+        if operation.strip() not in ('login', 'info', 'update', 'signup', 'reset'):
+            raise ValueError(f'Unknown operation in mix: {operation}')
+        mix.append((operation.strip(), float(weight)))
+    return mix
+
+def printReport(report: dict, baseline: dict = None):
+    print(f"{'operation':<16}{'requests':>10}{'errors':>8}{'rps':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'rpcs':>7}")
+    for operation, result in [('overall', report['overall'])] + sorted(report['operations'].items()):
+        line = (f"{operation:<16}{result['requests']:>10}{result['errors']:>8}{result['throughput-rps']:>10.1f}"
+                f"{result['p50-ms']:>10.2f}{result['p95-ms']:>10.2f}{result['p99-ms']:>10.2f}{result['mean-rpcs']:>7.2f}")
+        baseResult = (baseline or {}).get('operations', {}).get(operation) if operation != 'overall' else (baseline or {}).get('overall')
+        if baseResult and baseResult['p95-ms']:
+            line += f"   p95 {100 * (result['p95-ms'] / baseResult['p95-ms'] - 1):+.1f}%"
+            line += f"  rps {100 * (result['throughput-rps'] / baseResult['throughput-rps'] - 1):+.1f}%"
+        print(line)
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--target', help='base URL of a running server; by default one is started in-process')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=10.0, help='seconds to run')
+    parser.add_argument('--requests', type=int, default=0, help='stop each worker after this many requests')
+    parser.add_argument('--golfers', type=int, default=20, help='seeded golfers per worker')
+    parser.add_argument('--mix', help=f'weighted operations; default {DEFAULT_MIX}, or {TARGET_MIX} with --target')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--json', help='write the results to this file')
+    parser.add_argument('--compare', help='print the change against an earlier --json file')
+    args = parser.parse_args(argv)
+
+    captureTransport = None
+    target = args.target
+    if target is None:
+        captureTransport = CaptureTransport()
+        target = startLocalServer(captureTransport)
+
+    mixText = args.mix or (TARGET_MIX if args.target else DEFAULT_MIX)
+    mix = parseMix(mixText)
+    pools = seedGolfers(target, args.concurrency, args.golfers)
+    workers = [Worker(index, target, pools[index], mix, args.seed, captureTransport) for index in range(args.concurrency)]
+
+    started = time.perf_counter()
+    deadline = started + args.duration
+    threads = [threading.Thread(target=worker.run, args=(deadline, args.requests)) for worker in workers]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    samples = [sample for worker in workers for sample in worker.samples]
+    operations = sorted({operation for operation, _, _, _ in samples})
+    report = {
+        'started-at': datetime.now().isoformat(timespec='seconds'),
+        'config': {
+            'target': args.target or 'in-process',
+            # The backend of a remote server cannot be seen from here.
+            'storage-backend': 'unknown' if args.target else os.environ['STORAGE_BACKEND'],
+            'concurrency': args.concurrency,
+            'duration': args.duration,
+            'golfers-per-worker': args.golfers,
+            'mix': mixText,
+            'seed': args.seed
+        },
+        'elapsed-seconds': elapsed,
+        'overall': summarize(samples, elapsed),
+        'operations': {
+            operation: summarize([sample for sample in samples if sample[0] == operation], elapsed)
+            for operation in operations
+        }
+    }
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as baselineFile:
+            baseline = json.load(baselineFile)
+    printReport(report, baseline)
+    if args.json:
+        with open(args.json, 'w') as reportFile:
+            json.dump(report, reportFile, indent=2)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
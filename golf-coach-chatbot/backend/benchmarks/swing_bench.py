@@ -0,0 +1,152 @@
+"""Latency benchmark for the swing metrics engine on synthetic swings.
+
+Builds a batch of face-on swings with known phase timings, analyzes it repeatedly in one
+call, and checks the time per swing against a budget::
+
+    python -m benchmarks.swing_bench --swings 256 --fps 60 --budget-ms 1
+    python -m benchmarks.swing_bench --coords 3 --json swing.json
+
+Also reports how far the detected top and impact frames are from the synthetic ones, so
+a faster engine that finds the wrong phases does not pass unnoticed. Exits with status 1
+when the budget is exceeded.
+"""
+import argparse
+import json
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+
+from app.services import swing_service
+
+ADDRESS_SECONDS = 0.4
+FINISH_SECONDS = 0.8
+
+
+def easeInOut(progress: np.ndarray) -> np.ndarray:
+    return progress * progress * (3 - 2 * progress)
+
+
+def synthesizeSwings(swingCount: int, fps: float, coords: int, seed: int) -> tuple:
+    """Return ``(keypoints, lengths, truth)`` for ``swingCount`` random swings.
+
+    Swings are drawn in a y-up world scaled so the torso is one unit long. 2D swings are
+    projected to image pixels (y down) as a face-on camera would see them.
+    """
+    generator = np.random.default_rng(seed)
+    backswing = generator.uniform(0.7, 1.0, swingCount)
+    downswing = generator.uniform(0.22, 0.32, swingCount)
+    topTime = ADDRESS_SECONDS + backswing
+    impactTime = topTime + downswing
+    totalTime = impactTime + FINISH_SECONDS
+    lengths = np.ceil(totalTime * fps).astype(int)
+    time_ = np.arange(lengths.max())[None, :] / fps
+    time_ = np.minimum(time_, totalTime[:, None])
+
+    # Hands travel round the shoulders: hanging at address, up to the right at the top,
+    # accelerating through impact, and high on the left at the finish.
+    backProgress = np.clip((time_ - ADDRESS_SECONDS) / backswing[:, None], 0, 1)
+    downProgress = np.clip((time_ - topTime[:, None]) / downswing[:, None], 0, 1)
+    finishProgress = np.clip((time_ - impactTime[:, None]) / FINISH_SECONDS, 0, 1)
+    handAngle = np.radians(-90 + 170 * easeInOut(backProgress) - 170 * downProgress ** 2
+                           - 160 * (1 - (1 - finishProgress) ** 2))
+    shoulderTurn = np.radians(generator.uniform(75, 100, swingCount)[:, None] * easeInOut(backProgress)
+                              * (1 - downProgress) + 110 * finishProgress)
+    hipTurn = np.radians(generator.uniform(35, 50, swingCount)[:, None] * easeInOut(backProgress)
+                         * (1 - 0.5 * downProgress) + 90 * finishProgress)
+
+    frameShape = time_.shape
+    world = np.zeros(frameShape + (17, 3))
+    joints = swing_service.COCO_17
+    armLength = 1.3
+    shoulderCenter = np.array([0.0, 1.0, 0.0])
+    for side, sign in (('left', -1), ('right', 1)):
+        world[..., joints[f'{side}-shoulder'], 0] = sign * 0.4 * np.cos(shoulderTurn)
+        world[..., joints[f'{side}-shoulder'], 1] = 1.0
+        world[..., joints[f'{side}-shoulder'], 2] = sign * 0.4 * np.sin(shoulderTurn)
+        world[..., joints[f'{side}-hip'], 0] = sign * 0.3 * np.cos(hipTurn)
+        world[..., joints[f'{side}-hip'], 2] = sign * 0.3 * np.sin(hipTurn)
+        world[..., joints[f'{side}-knee'], :] = [sign * 0.3, -1.0, 0.0]
+        world[..., joints[f'{side}-ankle'], :] = [sign * 0.35, -2.0, 0.0]
+        world[..., joints[f'{side}-wrist'], 0] = armLength * np.cos(handAngle) + sign * 0.03
+        world[..., joints[f'{side}-wrist'], 1] = 1.0 + armLength * np.sin(handAngle)
+        world[..., joints[f'{side}-elbow'], :] = (world[..., joints[f'{side}-shoulder'], :]
+                                                  + world[..., joints[f'{side}-wrist'], :]) / 2
+        world[..., joints[f'{side}-eye'], :] = [sign * 0.05, 1.45, 0.0]
+        world[..., joints[f'{side}-ear'], :] = [sign * 0.1, 1.4, 0.0]
+    world[..., joints['nose'], :] = shoulderCenter + [0.0, 0.4, 0.0]
+    world += generator.normal(0, 0.004, world.shape)
+
+    truth = {
+        'top-frame': np.rint(topTime * fps).astype(int),
+        'impact-frame': np.rint(impactTime * fps).astype(int),
+        'tempo-ratio': backswing / downswing
+    }
+    if coords == 3:
+        return world, lengths, truth
+    image = world[..., :2] * [200.0, -200.0] + [640.0, 520.0]
+    return image, lengths, truth
+
+
+def timeBatches(keypoints: np.ndarray, lengths: np.ndarray, fps: float, yUp: bool, repeat: int) -> list:
+    perSwing = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        swing_service.analyzeSwings(keypoints, fps, lengths, yUp=yUp)
+        perSwing.append((time.perf_counter() - started) / len(keypoints))
+    return sorted(perSwing)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--swings', type=int, default=256, help='swings per batch')
+    parser.add_argument('--fps', type=float, default=60.0)
+    parser.add_argument('--coords', type=int, choices=(2, 3), default=2)
+    parser.add_argument('--repeat', type=int, default=20, help='timed runs of the whole batch')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--budget-ms', type=float, default=1.0, help='median batched time per swing')
+    parser.add_argument('--single-budget-ms', type=float, help='median time to analyze one swing on its own')
+    parser.add_argument('--json', help='write the results to this file')
+    args = parser.parse_args(argv)
+
+    keypoints, lengths, truth = synthesizeSwings(args.swings, args.fps, args.coords, args.seed)
+    yUp = args.coords == 3
+    metrics = swing_service.analyzeSwings(keypoints, args.fps, lengths, yUp=yUp)
+
+    batched = timeBatches(keypoints, lengths, args.fps, yUp, args.repeat)
+    single = timeBatches(keypoints[:1, :lengths[0]], lengths[:1], args.fps, yUp, args.repeat)
+    report = {
+        'started-at': datetime.now().isoformat(timespec='seconds'),
+        'config': {'swings': args.swings, 'fps': args.fps, 'coords': args.coords,
+                   'frames': keypoints.shape[1], 'repeat': args.repeat, 'seed': args.seed},
+        'batched-ms-per-swing': {'p50': batched[len(batched) // 2] * 1000, 'max': batched[-1] * 1000},
+        'single-swing-ms': {'p50': single[len(single) // 2] * 1000, 'max': single[-1] * 1000},
+        'swings-per-second': 1 / batched[len(batched) // 2],
+        'top-frame-error': float(np.abs(metrics['top-frame'] - truth['top-frame']).mean()),
+        'impact-frame-error': float(np.abs(metrics['impact-frame'] - truth['impact-frame']).mean()),
+        'tempo-ratio-error': float(np.abs(metrics['tempo-ratio'] - truth['tempo-ratio']).mean())
+    }
+
+    print(f"{args.swings} swings x {keypoints.shape[1]} frames, {args.coords}D, {args.fps:g} fps")
+    print(f"batched:      {report['batched-ms-per-swing']['p50']:8.3f} ms/swing "
+          f"({report['swings-per-second']:.0f} swings/s)")
+    print(f"single swing: {report['single-swing-ms']['p50']:8.3f} ms")
+    print(f"mean error:   top {report['top-frame-error']:.2f} frames, impact {report['impact-frame-error']:.2f} frames, "
+          f"tempo {report['tempo-ratio-error']:.2f}")
+    if args.json:
+        with open(args.json, 'w') as reportFile:
+            json.dump(report, reportFile, indent=2)
+
+    overBudget = []
+    if report['batched-ms-per-swing']['p50'] > args.budget_ms:
+        overBudget.append(f"{report['batched-ms-per-swing']['p50']:.3f} ms per swing (budget {args.budget_ms} ms)")
+    if args.single_budget_ms is not None and report['single-swing-ms']['p50'] > args.single_budget_ms:
+        overBudget.append(f"{report['single-swing-ms']['p50']:.3f} ms for one swing "
+                          f"(budget {args.single_budget_ms} ms)")
+    for message in overBudget:
+        print(f'OVER BUDGET: {message}')
+    return 1 if overBudget else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,6 @@
+from app import createApp
+
+app = createApp()
+
+if __name__ == '__main__':
+    app.run(debug=True)
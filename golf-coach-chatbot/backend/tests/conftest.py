@@ -0,0 +1,9 @@
+import os
+import sys
+
+# Must be set before the app modules read their configuration.
+os.environ.setdefault('STORAGE_BACKEND', 'memory')
+os.environ.setdefault('SLOW_REQUEST_MS', '0')
+os.environ.setdefault('CHAT_MODEL_BACKEND', 'fake')
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
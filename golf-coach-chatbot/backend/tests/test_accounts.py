@@ -0,0 +1,39 @@
+from app.services import firebase_service
+
+
+def signUp(email: str) -> str:
+    response = firebase_service.createAccountBasics({
+        'first-name': 'Sam', 'last-name': 'Golfer', 'email': email, 'password': 'password1'
+    })
+    return response['session_token']
+
+def rotateElsewhere(sessionToken: str) -> str:
+    # Another worker rotates the token: the store changes but this process's cache does not.
+    userId, _ = firebase_service.getStore().findUserBySessionToken(sessionToken)
+    firebase_service.getStore().updateUser(userId, {'session_token': 'rotated-' + sessionToken})
+    return 'rotated-' + sessionToken
+
+def testReadsMayUseCachedSession():
+    sessionToken = signUp('reader@example.com')
+    assert firebase_service.getAccountInfo(sessionToken)['status'] == 'success'
+    rotateElsewhere(sessionToken)
+    assert firebase_service.getAccountInfo(sessionToken)['status'] == 'success'
+
+def testPasswordResetChecksTheStore():
+    sessionToken = signUp('resetter@example.com')
+    firebase_service.getAccountInfo(sessionToken)
+    newToken = rotateElsewhere(sessionToken)
+    assert firebase_service.resetPassword('new-password', sessionToken)['status'] == 'error'
+    # The stale entry is dropped, so reads stop accepting the old token too.
+    assert firebase_service.getAccountInfo(sessionToken)['status'] == 'error'
+    assert firebase_service.resetPassword('new-password', newToken)['status'] == 'success'
+
+def testAccountUpdateChecksTheStore():
+    sessionToken = signUp('updater@example.com')
+    firebase_service.getAccountInfo(sessionToken)
+    rotateElsewhere(sessionToken)
+    response = firebase_service.updateAccountInfo({
+        'session_token': sessionToken, 'gender': '', 'level-of-golf': 'beginner', 'privacy': '',
+        'role': '', 'country': '', 'date-of-birth': '2000-01-01 00:00:00.000000'
+    })
+    assert response['status'] == 'error'
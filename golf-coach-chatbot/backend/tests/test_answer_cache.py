@@ -0,0 +1,82 @@
+import sqlite3
+import time
+
+import pytest
+
+from app.services.chatbot_services import AnswerCache, normalizeQuestion, profileKey
+
+BEGINNER = {'level-of-golf': 'Beginner', 'role': 'player', 'first-name': 'Sam'}
+EXPERT = {'level-of-golf': 'Expert', 'role': 'player'}
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    # Both tiers read the clock: the memory tier time.monotonic, the SQLite tier time.time.
+    now = [1000000.0]
+    monkeypatch.setattr(time, 'monotonic', lambda: now[0])
+    monkeypatch.setattr(time, 'time', lambda: now[0])
+    return now
+
+def testNormalizationDropsOnlyArticlesPronounsAndPunctuation():
+    assert normalizeQuestion('How do I fix MY slice?!') == normalizeQuestion('how do i fix a slice')
+    assert normalizeQuestion('Why do I slice?') == 'why do slice'
+    assert normalizeQuestion('Why do I slice?') != normalizeQuestion('What is a slice?')
+    assert normalizeQuestion('Should I use a driver?') != normalizeQuestion('Can I use a driver?')
+    assert normalizeQuestion('Please, the') == ''
+
+def testProfileKeyUsesOnlyAdviceFields():
+    assert profileKey(BEGINNER) == profileKey({'level-of-golf': ' beginner ', 'role': 'Player', 'first-name': 'Alex'})
+    assert profileKey(BEGINNER) != profileKey(EXPERT)
+
+def testAnswersAreKeyedByProfile(clock):
+    answers = AnswerCache(16, 60)
+    answers.set(BEGINNER, 'How do I stop slicing?', 'Strengthen your grip.')
+    assert answers.get(BEGINNER, 'how do i stop slicing') == 'Strengthen your grip.'
+    assert answers.get(EXPERT, 'How do I stop slicing?') is None
+    assert answers.get(BEGINNER, 'Why do I stop slicing?') is None
+
+def testAnswersExpireAfterTtl(clock, tmp_path):
+    answers = AnswerCache(16, 60, path=str(tmp_path / 'answers.db'))
+    answers.set(BEGINNER, 'How do I stop slicing?', 'Strengthen your grip.')
+    clock[0] += 59
+    assert answers.get(BEGINNER, 'How do I stop slicing?') == 'Strengthen your grip.'
+    clock[0] += 1
+    assert answers.get(BEGINNER, 'How do I stop slicing?') is None
+
+def testPersistentTierSurvivesANewInstance(clock, tmp_path):
+    path = str(tmp_path / 'answers.db')
+    AnswerCache(16, 60, path=path).set(BEGINNER, 'How do I stop slicing?', 'Strengthen your grip.')
+
+    restarted = AnswerCache(16, 60, path=path)
+    assert restarted.get(BEGINNER, 'How do I stop slicing?') == 'Strengthen your grip.'
+    assert restarted.get(BEGINNER, 'How do I stop slicing?') == 'Strengthen your grip.'
+    stats = restarted.stats()
+    assert (stats['persistent-hits'], stats['memory-hits']) == (1, 1)
+
+def testPersistentTierIsTrimmedToLeastRecentlyUsed(clock, tmp_path):
+    path = str(tmp_path / 'answers.db')
+    answers = AnswerCache(16, 600, path=path, persistentSize=3)
+    for index in range(3):
+        answers.set(BEGINNER, f'Question {index}', f'Answer {index}')
+        clock[0] += 1
+    AnswerCache(16, 600, path=path).get(BEGINNER, 'Question 0')
+    clock[0] += 1
+    answers.set(BEGINNER, 'Question 3', 'Answer 3')
+
+    with sqlite3.connect(path) as connection:
+        questions = sorted(row[0] for row in connection.execute('SELECT question FROM answers'))
+    assert questions == ['question 0', 'question 2', 'question 3']
+
+def testSimilarQuestionsNeedTheThreshold(clock):
+    answers = AnswerCache(16, 60, similarity=0.8)
+    answers.set(BEGINNER, 'How do I stop slicing my driver?', 'Close the face at impact.')
+    assert answers.get(BEGINNER, 'How do I stop slicing my driver off the tee?') == 'Close the face at impact.'
+    # Shares three of its four words with the cached question: similarity 0.67.
+    assert answers.get(BEGINNER, 'How do I stop hooking?') is None
+    assert answers.get(EXPERT, 'How do I stop slicing my driver off the tee?') is None
+    assert answers.stats()['similar-hits'] == 1
+
+def testSimilarityIsOffByDefault(clock):
+    answers = AnswerCache(16, 60)
+    answers.set(BEGINNER, 'How do I stop slicing my driver?', 'Close the face at impact.')
+    assert answers.get(BEGINNER, 'How do I stop slicing my driver off the tee?') is None
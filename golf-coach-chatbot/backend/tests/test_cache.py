@@ -0,0 +1,67 @@
+import pytest
+
+from app.utils import cache
+from app.utils.cache import TTLCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache.time, 'monotonic', lambda: now[0])
+    return now
+
+def testEntryExpiresAfterTtl(clock):
+    entries = TTLCache(ttl=10)
+    entries.set('a', 1)
+    clock[0] += 9.9
+    assert entries.get('a') == 1
+    clock[0] += 0.1
+    assert entries.get('a', 'missing') == 'missing'
+    assert entries.stats()['expirations'] == 1
+    assert len(entries) == 0
+
+def testPerEntryTtlOverridesDefault(clock):
+    entries = TTLCache(ttl=10)
+    entries.set('short', 1, ttl=1)
+    entries.set('long', 2)
+    clock[0] += 5
+    assert entries.get('short') is None
+    assert entries.get('long') == 2
+
+def testLeastRecentlyUsedEntryIsEvicted(clock):
+    entries = TTLCache(maxSize=2, ttl=10)
+    entries.set('a', 1)
+    entries.set('b', 2)
+    entries.get('a')
+    entries.set('c', 3)
+    assert entries.get('b') is None
+    assert entries.get('a') == 1 and entries.get('c') == 3
+    assert entries.stats()['evictions'] == 1
+
+def testSettingAnExistingKeyRefreshesIt(clock):
+    entries = TTLCache(maxSize=2, ttl=10)
+    entries.set('a', 1)
+    entries.set('b', 2)
+    clock[0] += 8
+    entries.set('a', 10)
+    entries.set('c', 3)
+    clock[0] += 8
+    assert entries.get('a') == 10
+    assert entries.get('b') is None
+
+def testStatsCountHitsAndMisses(clock):
+    entries = TTLCache()
+    entries.set('a', 1)
+    entries.get('a')
+    entries.get('b')
+    stats = entries.stats()
+    assert (stats['hits'], stats['misses'], stats['hit-rate']) == (1, 1, 0.5)
+
+def testInvalidateAndClear(clock):
+    entries = TTLCache()
+    entries.set('a', 1)
+    entries.set('b', 2)
+    assert entries.invalidate('a') is True
+    assert entries.invalidate('a') is False
+    entries.clear()
+    assert entries.get('b') is None
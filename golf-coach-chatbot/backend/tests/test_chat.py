@@ -0,0 +1,79 @@
+import json
+import threading
+
+import pytest
+
+from app import config, createApp
+from app.services import chatbot_services, conversation_service, firebase_service
+
+
+@pytest.fixture
+def client():
+    return createApp().test_client()
+
+@pytest.fixture
+def session(client, request):
+    response = client.post('/account/part1', json={
+        'first-name': 'Sam', 'last-name': 'Golfer', 'email': f'{request.node.name}@example.com', 'password': 'password1'
+    })
+    return response.json['session_token']
+
+@pytest.fixture
+def oneSlot(monkeypatch):
+    monkeypatch.setattr(chatbot_services, '_streamSlots', threading.BoundedSemaphore(1))
+
+def parseEvents(body: str) -> list:
+    assert body.endswith('\n\n')
+    events = []
+    for block in body[:-2].split('\n\n'):
+        eventLine, dataLine = block.split('\n')
+        assert eventLine.startswith('event: ') and dataLine.startswith('data: ')
+        events.append((eventLine[len('event: '):], json.loads(dataLine[len('data: '):])))
+    return events
+
+def summaryThrough(conversationId: str) -> int:
+    return conversation_service.getConversationStore().getConversation(conversationId)[1]['summary-through']
+
+def postStream(client, session: str, message: str, **fields):
+    return client.post('/chat/stream', json=dict(fields, session_token=session, message=message), buffered=False)
+
+def testStreamIsFramedAsServerSentEvents(client, session):
+    response = client.post('/chat/stream', json={'session_token': session, 'message': 'How do I fix my grip?'})
+    assert response.mimetype == 'text/event-stream'
+    events = parseEvents(response.get_data(as_text=True))
+
+    names = [name for name, _ in events]
+    assert names[0] == 'conversation' and names[-1] == 'done'
+    assert set(names[1:-1]) == {'token'}
+    reply = ''.join(data['token'] for name, data in events if name == 'token')
+    assert reply == chatbot_services.FakeModelClient().reply([{'role': 'user', 'content': 'How do I fix my grip?'}])
+    assert events[-1][1]['conversation_id'] == events[0][1]['conversation_id']
+    assert events[-1][1]['tokens'] == len(events) - 2
+
+def testSlotIsReleasedWhenTheClientDisconnects(client, session, oneSlot):
+    first = postStream(client, session, 'What about my stance?')
+    next(iter(first.response))
+    assert postStream(client, session, 'Still there?').status_code == 503
+
+    first.close()
+    second = postStream(client, session, 'And now?')
+    assert second.status_code == 200
+    second.close()
+
+def testBusyRequestDoesNotSummarizeTheConversation(client, session, oneSlot, monkeypatch):
+    monkeypatch.setattr(config, 'CONTEXT_TOKEN_BUDGET', config.SUMMARY_TOKEN_BUDGET + 30)
+    userId = firebase_service.findUserBySessionToken(session)[0]
+    conversationId, _ = conversation_service.startConversation(userId, 'Slice')
+    for index in range(4):
+        conversation_service.recordTurn(conversationId, f'Question {index}.'.ljust(60, '-'), f'Answer {index}.'.ljust(60, '-'))
+
+    chatbot_services.acquireStreamSlot()
+    try:
+        response = postStream(client, session, 'Why do I slice?', conversation_id=conversationId)
+        assert response.status_code == 503
+    finally:
+        chatbot_services.releaseStreamSlot()
+    assert summaryThrough(conversationId) == 0
+
+    postStream(client, session, 'Why do I slice?', conversation_id=conversationId).get_data()
+    assert summaryThrough(conversationId) > 0
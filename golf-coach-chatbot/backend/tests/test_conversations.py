@@ -0,0 +1,118 @@
+import base64
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app import config
+from app.database import MemoryConversationStore
+from app.services import conversation_service
+
+START = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def store(monkeypatch):
+    conversationStore = MemoryConversationStore()
+    monkeypatch.setattr(conversation_service, 'getConversationStore', lambda: conversationStore)
+    return conversationStore
+
+def encodeRaw(value) -> str:
+    return base64.urlsafe_b64encode(json.dumps(value).encode()).decode()
+
+def pageAll(userId: str, limit: int) -> list:
+    pages, cursor = [], None
+    while True:
+        response = conversation_service.listConversations(userId, limit, cursor)
+        pages.append([conversation['id'] for conversation in response['conversations']])
+        cursor = response['next_cursor']
+        if cursor is None:
+            return pages
+
+def testPagesAreNewestFirstWithoutGapsOrRepeats(store):
+    conversationIds = [store.createConversation('sam', f'Swing {index}', START + timedelta(minutes=index))
+                       for index in range(5)]
+    store.createConversation('alex', 'Not mine', START)
+    pages = pageAll('sam', 2)
+    assert pages == [conversationIds[4:2:-1], conversationIds[2:0:-1], conversationIds[:1]]
+
+def testConversationsWithEqualTimesAreAllPaged(store):
+    conversationIds = {store.createConversation('sam', 'Same time', START) for _ in range(5)}
+    pages = pageAll('sam', 2)
+    assert [len(page) for page in pages] == [2, 2, 1]
+    assert set(sum(pages, [])) == conversationIds
+
+def testNewMessageMovesConversationToFront(store):
+    olderId = store.createConversation('sam', 'Older', START)
+    newerId = store.createConversation('sam', 'Newer', START + timedelta(minutes=1))
+    store.appendMessages(olderId, [{'role': 'user', 'content': 'Still slicing.'}], START + timedelta(minutes=2))
+    assert pageAll('sam', 10) == [[olderId, newerId]]
+
+def testCursorRoundTrips():
+    cursor = (START, 'abc123')
+    assert conversation_service.decodeCursor(conversation_service.encodeCursor(cursor)) == cursor
+
+@pytest.mark.parametrize('text', [
+    encodeRaw(['2026-01-01T00:00:00', 'abc123']),
+    encodeRaw(['2026-01-01T00:00:00+00:00', 7]),
+    encodeRaw({'updated-at': '2026-01-01T00:00:00+00:00'}),
+    encodeRaw(['yesterday', 'abc123']),
+    'not a cursor'
+])
+def testBadCursorsAreRejected(text):
+    with pytest.raises(ValueError):
+        conversation_service.decodeCursor(text)
+
+
+def addTurns(store, conversationId: str, first: int, count: int):
+    for index in range(first, first + count):
+        role = 'user' if index % 2 == 0 else 'assistant'
+        # Every message costs 10 tokens.
+        store.appendMessages(conversationId, [{'role': role, 'content': f'Message {index:02d}.'.ljust(39, '-')}], START)
+
+def summaryNumbers(conversation: dict) -> list:
+    return [int(line.split('Message ')[1][:2]) for line in conversation['summary'].splitlines()]
+
+@pytest.fixture
+def smallContext(monkeypatch):
+    # Room for three messages after the summary's share of the budget.
+    monkeypatch.setattr(config, 'CONTEXT_MAX_MESSAGES', 6)
+    monkeypatch.setattr(config, 'CONTEXT_TOKEN_BUDGET', config.SUMMARY_TOKEN_BUDGET + 30)
+
+def testOlderMessagesAreSummarizedUpToTheWindow(store, smallContext):
+    conversationId = store.createConversation('sam', 'Slice', START)
+    addTurns(store, conversationId, 0, 10)
+    history = conversation_service.buildContext(*store.getConversation(conversationId))
+
+    conversation = store.getConversation(conversationId)[1]
+    assert conversation['summary-through'] == 7
+    assert summaryNumbers(conversation) == list(range(7))
+    assert history[0]['role'] == 'system'
+    assert [message['content'][:10] for message in history[1:]] == ['Message 07', 'Message 08', 'Message 09']
+
+def testSummaryIsOnlyExtendedWithMessagesThatLeftTheWindow(store, smallContext, monkeypatch):
+    conversationId = store.createConversation('sam', 'Slice', START)
+    addTurns(store, conversationId, 0, 10)
+    conversation_service.buildContext(*store.getConversation(conversationId))
+
+    updates = []
+    updateSummary = store.updateSummary
+    monkeypatch.setattr(store, 'updateSummary', lambda *args: updates.append(args) or updateSummary(*args))
+    conversation_service.buildContext(*store.getConversation(conversationId))
+    assert updates == []
+
+    addTurns(store, conversationId, 10, 2)
+    conversation_service.buildContext(*store.getConversation(conversationId))
+    conversation = store.getConversation(conversationId)[1]
+    assert conversation['summary-through'] == 9
+    assert summaryNumbers(conversation) == list(range(9))
+
+def testCatchUpReadIsBounded(store, smallContext):
+    conversationId = store.createConversation('sam', 'Slice', START)
+    addTurns(store, conversationId, 0, 20)
+    conversation_service.buildContext(*store.getConversation(conversationId))
+
+    # The six messages read for context plus at most six older ones.
+    conversation = store.getConversation(conversationId)[1]
+    assert conversation['summary-through'] == 17
+    assert summaryNumbers(conversation) == list(range(8, 17))
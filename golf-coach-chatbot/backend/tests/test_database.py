@@ -0,0 +1,71 @@
+import pytest
+
+from app import database
+from app.database import MemoryStore
+
+
+def user(email: str, sessionToken: str) -> dict:
+    return {'email': email, 'session_token': sessionToken, 'first-name': 'Sam'}
+
+def testLookupsFindCreatedUser():
+    store = MemoryStore()
+    userId = store.createUser(user('sam@example.com', 'token-1'))
+    assert store.findUserByEmail('sam@example.com') == (userId, user('sam@example.com', 'token-1'))
+    assert store.findUserBySessionToken('token-1')[0] == userId
+    assert store.findUserByEmail('other@example.com') is None
+
+def testUpdateMovesIndexedFields():
+    store = MemoryStore()
+    userId = store.createUser(user('sam@example.com', 'token-1'))
+    store.updateUser(userId, {'email': 'new@example.com', 'session_token': 'token-2'})
+    assert store.findUserByEmail('sam@example.com') is None
+    assert store.findUserBySessionToken('token-1') is None
+    assert store.findUserByEmail('new@example.com')[0] == userId
+    assert store.findUserBySessionToken('token-2')[0] == userId
+
+def testUpdateKeepsIndexOwnedByAnotherUser():
+    store = MemoryStore()
+    firstId = store.createUser(user('sam@example.com', 'shared'))
+    secondId = store.createUser(user('alex@example.com', 'other'))
+    store.updateUser(secondId, {'session_token': 'shared'})
+    store.updateUser(firstId, {'session_token': 'fresh'})
+    assert store.findUserBySessionToken('shared')[0] == secondId
+
+def testLookupsReturnCopies():
+    store = MemoryStore()
+    store.createUser(user('sam@example.com', 'token-1'))
+    store.findUserByEmail('sam@example.com')[1]['first-name'] = 'Changed'
+    assert store.findUserByEmail('sam@example.com')[1]['first-name'] == 'Sam'
+
+def testBatchCommitsOnceWithMergedUpdates():
+    store = MemoryStore()
+    rpcsBefore = database.getRpcCount()
+    with store.batch() as batch:
+        userId = batch.createUser(user('sam@example.com', 'token-1'))
+        batch.updateUser(userId, {'session_token': 'token-2'})
+        batch.upsertResetCode('sam@example.com', '123456', None)
+    assert database.getRpcCount() - rpcsBefore == 1
+    assert store.findUserBySessionToken('token-1') is None
+    assert store.findUserBySessionToken('token-2')[0] == userId
+    assert store.findResetCode('123456')[1]['email'] == 'sam@example.com'
+
+def testBatchIsNotCommittedOnError():
+    store = MemoryStore()
+    with pytest.raises(RuntimeError), store.batch() as batch:
+        batch.createUser(user('sam@example.com', 'token-1'))
+        raise RuntimeError
+    assert store.findUserByEmail('sam@example.com') is None
+
+def testBatchWithUnknownUserWritesNothing():
+    store = MemoryStore()
+    with pytest.raises(KeyError), store.batch() as batch:
+        batch.createUser(user('sam@example.com', 'token-1'))
+        batch.updateUser('missing', {'first-name': 'Alex'})
+    assert store.findUserByEmail('sam@example.com') is None
+
+def testResetCodeUpsertReplacesOldCode():
+    store = MemoryStore()
+    store.upsertResetCode('sam@example.com', '111111', None)
+    store.upsertResetCode('sam@example.com', '222222', None)
+    assert store.findResetCode('111111') is None
+    assert store.findResetCode('222222')[1]['email'] == 'sam@example.com'
@@ -0,0 +1,96 @@
+import email
+import os
+import threading
+
+import pytest
+
+from app.services import email_outbox
+from app.services.email_outbox import EmailOutbox
+from app.services.email_services import FileTransport, buildMimeMessage
+
+
+class FlakyTransport:
+    """Fails the first ``failures`` sends to each recipient."""
+
+    def __init__(self, failures: int):
+        self.failures = failures
+        self.attempts = {}
+        self.sent = []
+        self._lock = threading.Lock()
+
+    def send(self, message):
+        with self._lock:
+            attempt = self.attempts[message['to']] = self.attempts.get(message['to'], 0) + 1
+        if attempt <= self.failures:
+            raise OSError('Mail server unavailable')
+        with self._lock:
+            self.sent.append(message['to'])
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    delays = []
+    monkeypatch.setattr(email_outbox.time, 'sleep', delays.append)
+    return delays
+
+def message(to: str):
+    return buildMimeMessage('coach@example.com', to, 'Reset code', 'Your code is 123456')
+
+def testFailedSendsAreRetriedWithBackoff(sleeps):
+    transport = FlakyTransport(failures=2)
+    outbox = EmailOutbox(transport, workers=1, maxAttempts=5, retryBackoff=0.5)
+    outbox.enqueue(message('sam@example.com'))
+    assert outbox.drain(timeout=5)
+    outbox.stop()
+
+    assert transport.sent == ['sam@example.com']
+    assert sleeps == [0.5, 1.0]
+    stats = outbox.stats()
+    assert (stats['sent'], stats['failed'], stats['retries']) == (1, 0, 2)
+
+def testMessageIsFailedAfterMaxAttempts(sleeps):
+    transport = FlakyTransport(failures=10)
+    outbox = EmailOutbox(transport, workers=2, maxAttempts=3, retryBackoff=0)
+    for index in range(4):
+        outbox.enqueue(message(f'golfer{index}@example.com'))
+    assert outbox.drain(timeout=5)
+    outbox.stop()
+
+    assert transport.attempts == {f'golfer{index}@example.com': 3 for index in range(4)}
+    stats = outbox.stats()
+    assert (stats['enqueued'], stats['sent'], stats['failed'], stats['retries']) == (4, 0, 4, 8)
+    assert (stats['pending'], stats['queue-depth']) == (0, 0)
+
+def testDrainTimesOutWhileMessagesArePending():
+    release = threading.Event()
+
+    class BlockingTransport:
+        def send(self, message):
+            release.wait(5)
+
+    outbox = EmailOutbox(BlockingTransport(), workers=1)
+    outbox.enqueue(message('sam@example.com'))
+    outbox.enqueue(message('alex@example.com'))
+    assert outbox.drain(timeout=0.05) is False
+    assert outbox.stats()['pending'] == 2
+    release.set()
+    assert outbox.drain(timeout=5)
+    outbox.stop()
+    assert outbox.stats()['sent'] == 2
+
+def testFileTransportWritesEmlFiles(tmp_path):
+    directory = str(tmp_path / 'outbox')
+    transport = FileTransport(directory)
+    transport.send(message('sam@example.com'))
+    transport.send(message('alex@example.com'))
+
+    fileNames = sorted(os.listdir(directory))
+    assert len(fileNames) == 2 and all(fileName.endswith('.eml') for fileName in fileNames)
+    recipients = set()
+    for fileName in fileNames:
+        with open(os.path.join(directory, fileName), 'rb') as emailFile:
+            parsed = email.message_from_bytes(emailFile.read())
+        recipients.add(parsed['to'])
+        assert parsed['subject'] == 'Reset code'
+        assert 'Your code is 123456' in parsed.get_payload()[0].get_payload()
+    assert recipients == {'sam@example.com', 'alex@example.com'}
@@ -0,0 +1,63 @@
+import io
+
+import numpy as np
+import pytest
+
+from app import createApp
+from app.services import swing_service
+from benchmarks.swing_bench import synthesizeSwings
+
+
+@pytest.fixture
+def client():
+    return createApp().test_client()
+
+@pytest.fixture
+def session(client, request):
+    response = client.post('/account/part1', json={
+        'first-name': 'Sam', 'last-name': 'Golfer', 'email': f'{request.node.name}@example.com', 'password': 'password1'
+    })
+    return response.json['session_token']
+
+@pytest.fixture(scope='module')
+def swings():
+    keypoints, lengths, _ = synthesizeSwings(2, 30, 2, 0)
+    return [keypoints[index, :lengths[index]].tolist() for index in range(2)]
+
+def postNpy(client, session: str, keypoints: np.ndarray):
+    buffer = io.BytesIO()
+    np.save(buffer, keypoints)
+    buffer.seek(0)
+    return client.post('/swing/metrics', data={'session_token': session, 'keypoints': (buffer, 'swing.npy')})
+
+def testMetricsForJsonSwings(client, session, swings):
+    response = client.post('/swing/metrics', json={'session_token': session, 'swings': swings})
+    assert response.status_code == 200
+    assert len(response.json['swings']) == 2
+
+@pytest.mark.parametrize('fps', ['inf', 'nan', '-inf', 0, -30])
+def testFpsMustBeFiniteAndPositive(client, session, swings, fps):
+    response = client.post('/swing/metrics', json={'session_token': session, 'swings': swings, 'fps': fps})
+    assert response.status_code == 400
+
+def testNonFiniteKeypointsAreRejected(client, session, swings):
+    keypoints = np.array(swings[0])[None]
+    keypoints[0, 10, 9] = np.nan
+    response = postNpy(client, session, keypoints)
+    assert response.status_code == 400
+    assert 'finite' in response.json['message']
+
+def testSwingsWithDifferentJointCountsAreRejected(client, session, swings):
+    oneJoint = [frame[:1] for frame in swings[1]]
+    response = client.post('/swing/metrics', json={'session_token': session, 'swings': [swings[0], oneJoint]})
+    assert response.status_code == 400
+    assert 'same number of joints' in response.json['message']
+
+def testEverySwingNeedsFourFrames(client, session, swings):
+    response = client.post('/swing/metrics', json={'session_token': session, 'swings': [swings[0], swings[1][:3]]})
+    assert response.status_code == 400
+
+def testPadSwingsRepeatsLastFrame():
+    padded, lengths = swing_service.padSwings([[[[0, 0]]] * 2, [[[1, 1]], [[2, 2]], [[3, 3]]]])
+    assert lengths.tolist() == [2, 3]
+    assert padded[0, :, 0].tolist() == [[0, 0], [0, 0], [0, 0]]
@@ -0,0 +1,220 @@
+import io
+import os
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app import config, createApp
+from app.database import MemoryUploadStore, newUpload
+from app.services import upload_service
+from app.services.upload_storage import LocalUploadStorage, OffsetConflict
+
+DATA = bytes(range(256)) * 4
+NOW = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+class RecordingQueue:
+    def __init__(self):
+        self.uploadIds = []
+
+    def enqueue(self, uploadId: str):
+        self.uploadIds.append(uploadId)
+
+
+@pytest.fixture
+def storage(tmp_path, monkeypatch):
+    uploadStorage = LocalUploadStorage(str(tmp_path))
+    monkeypatch.setattr(upload_service, 'getUploadStorage', lambda: uploadStorage)
+    return uploadStorage
+
+@pytest.fixture
+def queue(monkeypatch):
+    jobs = RecordingQueue()
+    monkeypatch.setattr(upload_service, 'getJobQueue', lambda: jobs)
+    return jobs
+
+@pytest.fixture
+def client(storage, queue, monkeypatch):
+    uploadStore = MemoryUploadStore()
+    monkeypatch.setattr(upload_service, 'getUploadStore', lambda: uploadStore)
+    monkeypatch.setattr(config, 'UPLOAD_CHUNK_SIZE', 400)
+    return createApp().test_client()
+
+def signUp(client, email: str) -> str:
+    response = client.post('/account/part1', json={
+        'first-name': 'Sam', 'last-name': 'Golfer', 'email': email, 'password': 'password1'
+    })
+    return response.json['session_token']
+
+@pytest.fixture
+def session(client, request):
+    return signUp(client, f'{request.node.name}@example.com')
+
+def startUpload(client, session: str, size: int = len(DATA)) -> str:
+    response = client.post('/uploads', json={'session_token': session, 'file_name': 'swing.mp4', 'size': size})
+    assert response.status_code == 201
+    return response.json['upload_id']
+
+def putChunk(client, session: str, uploadId: str, offset, data: bytes):
+    return client.put(f'/uploads/{uploadId}', data=data, content_type='application/octet-stream',
+                      query_string={'session_token': session, 'offset': offset})
+
+def testChunkMustStartAtReceivedOffset(client, session):
+    uploadId = startUpload(client, session)
+    response = putChunk(client, session, uploadId, 100, DATA[100:200])
+    assert response.status_code == 409
+    assert response.json['received'] == 0
+
+    assert putChunk(client, session, uploadId, 0, DATA[:300]).json['received'] == 300
+    response = putChunk(client, session, uploadId, 0, DATA[:300])
+    assert response.status_code == 409
+    assert response.json['received'] == 300
+
+def testUploadResumesFromReceivedCount(client, session, storage, queue):
+    uploadId = startUpload(client, session)
+    putChunk(client, session, uploadId, 0, DATA[:400])
+    putChunk(client, session, uploadId, 400, DATA[400:700])
+
+    received = client.get(f'/uploads/{uploadId}', query_string={'session_token': session}).json['received']
+    assert received == 700
+    response = putChunk(client, session, uploadId, received, DATA[received:])
+    assert response.json['state'] == 'queued'
+    assert queue.uploadIds == [uploadId]
+    with storage.localCopy(f'files/{uploadId}.mp4') as path, open(path, 'rb') as uploadFile:
+        assert uploadFile.read() == DATA
+
+    response = putChunk(client, session, uploadId, len(DATA), b'x')
+    assert response.status_code == 409
+
+def testChunkSizeRules(client, session):
+    uploadId = startUpload(client, session, size=500)
+    assert putChunk(client, session, uploadId, 0, b'').status_code == 400
+    assert putChunk(client, session, uploadId, 0, DATA[:401]).status_code == 413
+    putChunk(client, session, uploadId, 0, DATA[:400])
+    assert putChunk(client, session, uploadId, 400, DATA[400:600]).status_code == 400
+
+def testUploadsBelongToTheirUser(client, session):
+    uploadId = startUpload(client, session)
+    otherSession = signUp(client, 'other-golfer@example.com')
+    assert putChunk(client, otherSession, uploadId, 0, DATA[:100]).status_code == 404
+    assert client.get(f'/uploads/{uploadId}', query_string={'session_token': otherSession}).status_code == 404
+
+
+class SlowStream(io.BytesIO):
+    def read(self, size=-1):
+        time.sleep(0.05)
+        return super().read(size)
+
+def testOnlyOneConcurrentChunkIsAppendedAtAnOffset(storage):
+    results = []
+
+    def append():
+        try:
+            results.append(storage.appendChunk('upload', 0, SlowStream(DATA[:100]), 100))
+        except OffsetConflict as e:
+            results.append(('conflict', e.received))
+
+    threads = [threading.Thread(target=append) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(results, key=str) == [('conflict', 100)] * 3 + [100]
+    assert storage.received('upload') == 100
+
+def testLateChunkDoesNotRecreateFinalizedUpload(storage):
+    storage.appendChunk('upload', 0, io.BytesIO(DATA), len(DATA))
+    storage.finalize('upload', 'swing.mp4')
+    with pytest.raises(OffsetConflict):
+        storage.appendChunk('upload', 100, io.BytesIO(DATA[:10]), 10)
+    assert os.listdir(os.path.join(storage.directory, 'partial')) == []
+
+def testStateChangeOnlySucceedsFromTheExpectedState():
+    uploadStore = MemoryUploadStore()
+    uploadId = uploadStore.createUpload(newUpload('sam', 'swing.mp4', 10, 'video/mp4', {}, NOW))
+    assert uploadStore.transitionUpload(uploadId, 'uploading', {'state': 'queued'}) is True
+    assert uploadStore.transitionUpload(uploadId, 'uploading', {'state': 'queued'}) is False
+    assert uploadStore.getUpload(uploadId)[1]['state'] == 'queued'
+
+def testRequestThatLosesTheStateChangeDoesNotQueueTheUpload(storage, queue, monkeypatch):
+    uploadStore = MemoryUploadStore()
+    monkeypatch.setattr(upload_service, 'getUploadStore', lambda: uploadStore)
+    upload = newUpload('sam', 'swing.mp4', len(DATA), 'video/mp4', {}, NOW)
+    uploadId = uploadStore.createUpload(upload)
+    storage.appendChunk(uploadId, 0, io.BytesIO(DATA[:-1]), len(DATA) - 1)
+
+    # Another request has already moved the upload on.
+    uploadStore.transitionUpload(uploadId, 'uploading', {'state': 'queued'})
+    response = upload_service.receiveChunk(uploadId, upload, len(DATA) - 1, io.BytesIO(DATA[-1:]), 1)
+    assert response['state'] == 'queued'
+    assert queue.uploadIds == []
+
+def testKeypointFilesOutsideTheSwingLimitsAreRefused(tmp_path, monkeypatch):
+    import numpy as np
+
+    monkeypatch.setattr(config, 'SWING_MAX_FRAMES', 50)
+    path = str(tmp_path / 'swing.npy')
+    np.save(path, np.zeros((1, 51, 17, 2)))
+    with pytest.raises(ValueError, match='At most'):
+        upload_service.analyzeKeypointFile(path, {})
+    np.save(path, np.zeros((1, 50, 5, 2)))
+    with pytest.raises(ValueError, match='joints per frame'):
+        upload_service.analyzeKeypointFile(path, {})
+
+def testKeypointUploadsAreCappedAtTheSwingBodySize(client, session, monkeypatch):
+    monkeypatch.setattr(config, 'SWING_MAX_BODY_BYTES', 1000)
+    response = client.post('/uploads', json={'session_token': session, 'file_name': 'swing.npy', 'size': 1001})
+    assert response.status_code == 400
+    response = client.post('/uploads', json={'session_token': session, 'file_name': 'swing.mp4', 'size': 1001})
+    assert response.status_code == 201
+
+@pytest.fixture
+def uploadStore(monkeypatch):
+    store = MemoryUploadStore()
+    monkeypatch.setattr(upload_service, 'getUploadStore', lambda: store)
+    return store
+
+def createInState(uploadStore, state: str, updatedAt) -> str:
+    upload = newUpload('sam', 'swing.mp4', 10, 'video/mp4', {}, updatedAt)
+    return uploadStore.createUpload(dict(upload, state=state, object='files/swing.mp4'))
+
+def testRecoveryRequeuesStaleUploadsAndFailsInterruptedOnes(uploadStore, queue):
+    stale = datetime.now(timezone.utc) - timedelta(seconds=config.UPLOAD_STALE_SECONDS + 60)
+    queuedId = createInState(uploadStore, 'queued', stale)
+    processingId = createInState(uploadStore, 'processing', stale)
+    freshId = createInState(uploadStore, 'queued', datetime.now(timezone.utc))
+    doneId = createInState(uploadStore, 'done', stale)
+
+    upload_service.recoverUploads(queue)
+    assert queue.uploadIds == [queuedId]
+    assert uploadStore.getUpload(processingId)[1]['state'] == 'failed'
+    assert uploadStore.getUpload(freshId)[1]['state'] == 'queued'
+    assert uploadStore.getUpload(doneId)[1]['state'] == 'done'
+
+def testUploadQueuedTwiceIsProcessedOnce(uploadStore, storage, monkeypatch):
+    uploadId = createInState(uploadStore, 'queued', NOW)
+    processed = []
+    monkeypatch.setattr(upload_service, 'extractFrames', lambda uploadId, path: processed.append(uploadId) or {})
+    upload_service.processUpload(uploadId)
+    upload_service.processUpload(uploadId)
+    assert processed == [uploadId]
+    assert uploadStore.getUpload(uploadId)[1]['state'] == 'done'
+
+def testFailureToReadTheUploadMarksItFailed(uploadStore, storage, monkeypatch):
+    uploadId = createInState(uploadStore, 'queued', NOW)
+    monkeypatch.setattr(uploadStore, 'getUpload', lambda uploadId: None)
+    with pytest.raises(TypeError):
+        upload_service.processUpload(uploadId)
+    assert uploadStore._uploads[uploadId]['state'] == 'failed'
+
+@pytest.mark.parametrize('yUp, expected', [(True, True), ('true', True), ('1', True), ('false', False), (False, False)])
+def testYUpIsParsedLikeSwingMetrics(client, session, uploadStore, yUp, expected):
+    response = client.post('/uploads', json={'session_token': session, 'file_name': 'swing.npy', 'size': 10, 'y_up': yUp})
+    assert uploadStore.getUpload(response.json['upload_id'])[1]['options']['y-up'] is expected
+
+@pytest.mark.parametrize('fps', ['nan', 'inf', 0, -1])
+def testUploadFpsMustBeFiniteAndPositive(client, session, fps):
+    response = client.post('/uploads', json={'session_token': session, 'file_name': 'swing.npy', 'size': 10, 'fps': fps})
+    assert response.status_code == 400